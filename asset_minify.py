@@ -0,0 +1,207 @@
+import gzip
+import json
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Precompressed siblings a static host can serve in place of the original
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+CSS_TOKEN_PATTERN = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|/\*.*?\*/", re.S)
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,>])\s*")
+HTML_BLOCK_PATTERN = re.compile(r"<(script|style)\b([^>]*)>(.*?)</\1>", re.S | re.I)
+SCRIPT_TYPE_PATTERN = re.compile(r"""\btype\s*=\s*["']?([^"'\s>]+)""", re.I)
+# <script type="..."> values that hold JavaScript; other types (JSON, templates) are copied verbatim
+JS_SCRIPT_TYPES = {"text/javascript", "application/javascript", "module"}
+HTML_COMMENT_PATTERN = re.compile(r"<!--(?!\[).*?-->", re.S)
+
+# Keywords after which a '/' starts a regular expression rather than a division
+REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete",
+                  "void", "throw", "yield", "await", "instanceof"}
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+
+def minify_css(css):
+    """Drops comments and insignificant whitespace; string literals are left alone."""
+    parts = []
+    last = 0
+    for match in CSS_TOKEN_PATTERN.finditer(css):
+        parts.append(compact_css(css[last:match.start()]))
+        if match.group(1):
+            parts.append(match.group(1))
+        last = match.end()
+    parts.append(compact_css(css[last:]))
+    return "".join(parts).strip().replace(";}", "}")
+
+def compact_css(text):
+    text = re.sub(r"\s+", " ", text)
+    text = CSS_PUNCTUATION_PATTERN.sub(r"\1", text)
+    return re.sub(r":\s+", ":", text)
+
+def minify_js(source):
+    """
+    Drops comments, indentation and blank lines. Line breaks are kept so
+    automatic semicolon insertion behaves exactly as in the source, and
+    string, template and regex literals are copied verbatim.
+    """
+    out = []
+    end = scan_js(source, 0, out, False)
+    assert end == len(source)
+    return "".join(out).strip()
+
+def scan_js(src, i, out, in_template):
+    """Copies code from src[i:] into out; inside a template substitution, stops after its closing brace."""
+    n = len(src)
+    depth = 0
+    pending = None  # whitespace seen since the last token: None, ' ' or '\n'
+    prev = ""  # last significant token, to tell regex literals from division
+
+    def flush():
+        if pending and out and out[-1][-1:] != "\n":
+            out.append(pending)
+
+    while i < n:
+        c = src[i]
+        if c in " \t\r\n":
+            if c == "\n" or pending == "\n":
+                pending = "\n"
+            else:
+                pending = " "
+            i += 1
+            continue
+        if src.startswith("//", i):
+            i = src.find("\n", i)
+            i = n if i == -1 else i
+            continue
+        if src.startswith("/*", i):
+            close = src.index("*/", i + 2)
+            if "\n" in src[i:close] or pending == "\n":
+                pending = "\n"
+            else:
+                pending = pending or " "
+            i = close + 2
+            continue
+
+        flush()
+        pending = None
+        if c in "\"'":
+            j = i + 1
+            while src[j] != c:
+                j += 2 if src[j] == "\\" else 1
+            out.append(src[i:j + 1])
+            i = j + 1
+            prev = c
+        elif c == "`":
+            i = scan_template(src, i, out)
+            prev = c
+        elif c == "/" and (not prev or prev in REGEX_PRECEDERS or prev in REGEX_KEYWORDS):
+            j = i + 1
+            in_class = False
+            while in_class or src[j] != "/":
+                if src[j] == "\\":
+                    j += 1
+                elif src[j] == "[":
+                    in_class = True
+                elif src[j] == "]":
+                    in_class = False
+                j += 1
+            j += 1
+            while j < n and (src[j].isalnum() or src[j] == "_"):
+                j += 1
+            out.append(src[i:j])
+            i = j
+            prev = "/re/"
+        elif c.isalnum() or c in "_$":
+            j = i
+            while j < n and (src[j].isalnum() or src[j] in "_$"):
+                j += 1
+            out.append(src[i:j])
+            prev = src[i:j]
+            i = j
+        else:
+            if in_template:
+                if c == "{":
+                    depth += 1
+                elif c == "}":
+                    if depth == 0:
+                        out.append(c)
+                        return i + 1
+                    depth -= 1
+            out.append(c)
+            prev = c
+            i += 1
+    return i
+
+def scan_template(src, i, out):
+    """Copies a template literal starting at src[i], minifying the code inside ${...}."""
+    out.append("`")
+    i += 1
+    while src[i] != "`":
+        if src[i] == "\\":
+            out.append(src[i:i + 2])
+            i += 2
+        elif src.startswith("${", i):
+            out.append("${")
+            i = scan_js(src, i + 2, out, True)
+        else:
+            out.append(src[i])
+            i += 1
+    out.append("`")
+    return i + 1
+
+def minify_html(html):
+    """Minifies inline <style> and <script> blocks and strips indentation and comments from the markup."""
+    parts = []
+    last = 0
+    for match in HTML_BLOCK_PATTERN.finditer(html):
+        parts.append(compact_markup(html[last:match.start()]))
+        parts.append(minify_block(*match.groups()))
+        last = match.end()
+    parts.append(compact_markup(html[last:]))
+    return "".join(parts).strip()
+
+def compact_markup(markup):
+    markup = HTML_COMMENT_PATTERN.sub("", markup)
+    return re.sub(r"\s*\n\s*", "\n", markup)
+
+def minify_block(tag, attributes, body):
+    """One <script> or <style> element, its attributes kept as written."""
+    if tag.lower() == "style":
+        body = minify_css(body)
+    else:
+        script_type = SCRIPT_TYPE_PATTERN.search(attributes)
+        if script_type is None or script_type.group(1).lower() in JS_SCRIPT_TYPES:
+            body = minify_js(body)
+    return f"<{tag}{attributes}>{body}</{tag}>"
+
+def minify_json(text):
+    return json.dumps(json.loads(text), separators=(',', ':'), ensure_ascii=False)
+
+MINIFIERS = {".html": minify_html, ".css": minify_css, ".js": minify_js, ".json": minify_json}
+
+def minify_output(path, content):
+    """Minified content for path, or content unchanged for types without a minifier (and binaries)."""
+    if isinstance(content, bytes):
+        return content
+    for extension, minifier in MINIFIERS.items():
+        if path.endswith(extension):
+            return minifier(content)
+    return content
+
+# Text formats worth precompressing; images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = (".html", ".js", ".json", ".css", ".svg", ".webmanifest")
+
+def is_compressible(path):
+    return path.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+def compress_variants(data):
+    """{suffix: bytes} for each precompressed variant that is smaller than data."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    # A tiny file can grow; the host then serves the original
+    return {suffix: blob for suffix, blob in variants.items() if len(blob) < len(data)}
@@ -0,0 +1,78 @@
+import json
+import random
+import shutil
+import subprocess
+import sys
+
+from bench_model import CATEGORIES, ROLE_SETS
+from build_html import FILTER_ENGINE_JS
+from catalog_indexes import build_filter_index
+
+# Catalog sizes, and how often each chip/toggle combination is timed
+PARTNERS = [1000, 10000, 100000]
+REPEATS = 200
+QUERIES = [
+    {"category": CATEGORIES[0], "roles": []},
+    {"category": None, "roles": ["Alumni"]},
+    {"category": CATEGORIES[1], "roles": ["Students", "Faculty"]},
+]
+
+# Times the page's bitset filter against the per-record scan it replaced, and the
+# chip and toggle counts taken from the same bitsets, in node
+NODE_SCRIPT = FILTER_ENGINE_JS + """
+const { discounts, index, queries, repeats } = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+let start = process.hrtime.bigint();
+const engine = createFilterEngine(index, discounts.length);
+const decodeMicros = Number(process.hrtime.bigint() - start) / 1000;
+
+function scan(category, roles) {
+    return discounts.map((d, i) => i).filter(i => {
+        const d = discounts[i];
+        if (category && d.category !== category) return false;
+        return roles.length === 0 || roles.some(role => d.whoCanRedeem.includes(role));
+    });
+}
+
+function time(run) {
+    const start = process.hrtime.bigint();
+    let result;
+    for (let r = 0; r < repeats; r++) result = run();
+    return { micros: Number(process.hrtime.bigint() - start) / 1000 / repeats, result };
+}
+
+const rows = queries.map(({ category, roles }) => {
+    const bits = time(() => engine.match(category, roles));
+    const full = time(() => scan(category, roles));
+    const matched = discounts.map((d, i) => i).filter(i => hasBit(bits.result, i));
+    if (JSON.stringify(matched) !== JSON.stringify(full.result)) throw new Error('bitset and scan disagree');
+    const facets = time(() => engine.facetCounts(null, category, roles));
+    return { category, roles, matched: matched.length, bitsMicros: bits.micros, scanMicros: full.micros,
+             facetMicros: facets.micros };
+});
+console.log(JSON.stringify({ decodeMicros, rows }));
+"""
+
+def synthetic_catalog(count, seed=23):
+    rng = random.Random(seed)
+    return [{"id": str(i), "category": rng.choice(CATEGORIES), "whoCanRedeem": rng.choice(ROLE_SETS)}
+            for i in range(count)]
+
+def main():
+    if shutil.which("node") is None:
+        print("node is required to run the page's filter engine.")
+        sys.exit(1)
+    print(f"{'partners':>9} {'query':>34} {'matched':>8} {'bitset us':>10} {'scan us':>9} {'speedup':>8} {'facets us':>10}")
+    for count in PARTNERS:
+        discounts = synthetic_catalog(count)
+        payload = json.dumps({"discounts": discounts, "index": build_filter_index(discounts),
+                              "queries": QUERIES, "repeats": REPEATS})
+        result = json.loads(subprocess.run(["node", "-e", NODE_SCRIPT], input=payload,
+                                           capture_output=True, text=True, check=True).stdout)
+        for row in result["rows"]:
+            query = " + ".join(filter(None, [row["category"], "/".join(row["roles"])]))
+            print(f"{count:>9} {query[:34]:>34} {row['matched']:>8} {row['bitsMicros']:>10.1f} "
+                  f"{row['scanMicros']:>9.1f} {row['scanMicros'] / row['bitsMicros']:>7.1f}x {row['facetMicros']:>10.1f}")
+        print(f"{count:>9} {'(bitsets decoded once on load)':>34} {'':>8} {result['decodeMicros']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import json
+import random
+import shutil
+import subprocess
+import sys
+
+from build_html import GEO_ENGINE_JS
+from catalog_indexes import build_geo_index
+from geocode import CAMPUSES, RGV_CITIES
+
+# Synthetic catalog size and the queries timed against it
+PARTNERS = 10000
+QUERIES = 500
+RADII_MILES = [1, 5, 10, 25]
+NEAREST_N = [1, 10, 50]
+
+# Runs the page's own geo engine in node against the build-time index, timing
+# grid queries and the full scan they replace on the same origins.
+NODE_SCRIPT = GEO_ENGINE_JS + """
+const { discounts, index, origins, radii, nearestN } = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const query = createGeoQuery(index, discounts);
+
+function scan(lat, lng) {
+    const found = [];
+    discounts.forEach((d, position) => {
+        if (d.lat != null) found.push({ position, miles: distanceMiles(lat, lng, d.lat, d.lng) });
+    });
+    return found.sort((a, b) => a.miles - b.miles);
+}
+
+function time(run) {
+    const start = process.hrtime.bigint();
+    let results = 0;
+    for (const [lat, lng] of origins) results += run(lat, lng).length;
+    return { micros: Number(process.hrtime.bigint() - start) / 1000 / origins.length, results: results / origins.length };
+}
+
+const rows = [];
+for (const miles of radii) {
+    const grid = time((lat, lng) => query.withinRadius(lat, lng, miles));
+    const full = time((lat, lng) => scan(lat, lng).filter(hit => hit.miles <= miles));
+    rows.push({ query: `within ${miles} mi`, grid, full });
+}
+for (const n of nearestN) {
+    const grid = time((lat, lng) => query.nearest(lat, lng, n));
+    const full = time((lat, lng) => scan(lat, lng).slice(0, n));
+    rows.push({ query: `nearest ${n}`, grid, full });
+}
+console.log(JSON.stringify(rows));
+"""
+
+def synthetic_catalog(count, seed=20):
+    """Partners scattered around the Valley's cities; every tenth one online (no coordinates)."""
+    rng = random.Random(seed)
+    centers = list(RGV_CITIES.values())
+    discounts = []
+    for i in range(count):
+        if i % 10 == 0:
+            discounts.append({"id": str(i), "lat": None, "lng": None})
+            continue
+        lat, lng = rng.choice(centers)
+        discounts.append({"id": str(i), "lat": round(lat + rng.gauss(0, 0.03), 5),
+                          "lng": round(lng + rng.gauss(0, 0.03), 5)})
+    return discounts
+
+def main():
+    if shutil.which("node") is None:
+        print("node is required to run the page's geo engine.")
+        sys.exit(1)
+    discounts = synthetic_catalog(PARTNERS)
+    rng = random.Random(1)
+    # Visitors near campuses, the way the page is mostly used
+    origins = [(lat + rng.uniform(-0.05, 0.05), lng + rng.uniform(-0.05, 0.05))
+               for lat, lng in (rng.choice(list(CAMPUSES.values())) for _ in range(QUERIES))]
+    index = build_geo_index(discounts)
+    payload = json.dumps({"discounts": discounts, "index": index, "origins": origins,
+                          "radii": RADII_MILES, "nearestN": NEAREST_N})
+    result = subprocess.run(["node", "-e", NODE_SCRIPT], input=payload, capture_output=True, text=True, check=True)
+
+    print(f"{PARTNERS} partners in {len(index['cells'])} cells, {QUERIES} queries each")
+    print(f"{'query':>16} {'results':>8} {'grid us':>9} {'scan us':>9} {'speedup':>8}")
+    for row in json.loads(result.stdout):
+        grid, full = row["grid"], row["full"]
+        print(f"{row['query']:>16} {grid['results']:>8.1f} {grid['micros']:>9.1f} {full['micros']:>9.1f} "
+              f"{full['micros'] / grid['micros']:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Row counts to benchmark. Peak RSS should stay flat across them.
+ROW_COUNTS = [1000, 10000, 50000, 100000]
+
+SHEET_HEADERS = [
+    "Name of the Business", "Discount Amount", "Who Can Redeem", "How to Redeem",
+    "About this Business", "Address", "Phone", "Email address", "Website/Social Media",
+    "Category", "VDP Join Date", "Authorized by", "Contact Title/Role"
+]
+
+# Runs one ingest in a fresh interpreter and reports that process's own peak RSS;
+# a failed ingest exits non-zero so the benchmark stops instead of timing nothing.
+CHILD_SCRIPT = """
+import resource, sys
+sys.path.insert(0, sys.argv[3])
+import fetch_and_process
+if fetch_and_process.main(sys.argv[1], sys.argv[2]) is None:
+    sys.exit(1)
+print("MAXRSS_KB", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def write_synthetic_sheet(path, rows):
+    """Writes a sheet export with the same columns as the published Google Sheet."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SHEET_HEADERS)
+        for i in range(rows):
+            writer.writerow([
+                f"Business {i}", "10% off", "Students, Faculty, and Staff", "UTRGV ID",
+                "Synthetic partner used for ingest benchmarking. " * 4,
+                f"{i} W University Dr, Edinburg, TX 78539", "(956) 555-0100",
+                f"owner{i}@example.com", f"https://example.com/{i}",
+                "Eat & Drink (Food & Dining)", "06/01/2025", "Jane Doe", "Owner"
+            ])
+
+def run_ingest(sheet_path, output_path):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, sheet_path.as_uri(), str(output_path), REPO_DIR],
+        capture_output=True, text=True, check=True,
+        cwd=output_path.parent # keeps the fetch cache out of the repo
+    )
+    elapsed = time.perf_counter() - start
+    for line in result.stdout.splitlines():
+        if line.startswith("MAXRSS_KB"):
+            return int(line.split()[1]), elapsed
+    raise RuntimeError(f"Ingest did not report memory usage:\n{result.stdout}\n{result.stderr}")
+
+def main():
+    print(f"{'rows':>8} {'sheet MB':>9} {'peak RSS MB':>12} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in ROW_COUNTS:
+            sheet_path = Path(tmp) / f"sheet_{rows}.csv"
+            write_synthetic_sheet(sheet_path, rows)
+            maxrss_kb, elapsed = run_ingest(sheet_path, Path(tmp) / f"out_{rows}.csv")
+            sheet_mb = sheet_path.stat().st_size / (1024 * 1024)
+            print(f"{rows:>8} {sheet_mb:>9.1f} {maxrss_kb / 1024:>12.1f} {elapsed:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import csv
+import gc
+import io
+import json
+import random
+import time
+import tracemalloc
+
+from discount_model import CSV_FIELDNAMES, from_csv_row, new_discount, to_columns, to_csv_row, to_json
+
+ROWS = 100000
+
+CATEGORIES = ["Eat & Drink (Food & Dining)", "Shop (Retail)", "Health & Beauty", "Auto & Tech",
+              "Fun & Events (Entertainment)", "Services & Travel", "Other"]
+ROLE_SETS = [["Students", "Faculty", "Staff"], ["Students"], ["Faculty", "Staff"],
+             ["Students", "Faculty", "Staff", "Alumni"], ["Alumni"]]
+
+def synthetic_csv(rows, seed=21):
+    """categorized_discounts.csv text with rows synthetic partners."""
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDNAMES)
+    writer.writeheader()
+    for i in range(rows):
+        category = rng.choice(CATEGORIES)
+        writer.writerow(to_csv_row(new_discount(
+            id=f"business-{i}", businessName=f"Business {i}", category=category,
+            discountAmount=f"{rng.choice([5, 10, 15, 20])}% off", whoCanRedeem=rng.choice(ROLE_SETS),
+            howToRedeem="Show UTRGV ID", description="Synthetic partner used for benchmarking.",
+            address=f"{i} W University Dr, Edinburg, TX 78539", phone="(956) 555-0100",
+            campusProximity="1.8 mi from UTRGV Edinburg", isFeatured=i % 7 == 0,
+            tags=[category.split(" ")[0].lower()], latitude=26.28, longitude=-98.183,
+            nearestCampus="Edinburg", campusDistanceMiles=1.8)))
+    return out.getvalue()
+
+def measure(build):
+    """(result, bytes allocated by build() and still held by the result)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, held
+
+def timed(run):
+    """Seconds run() takes, outside tracemalloc."""
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+def main():
+    text = synthetic_csv(ROWS)
+    print(f"{ROWS} synthetic rows, {len(text) / (1024 * 1024):.1f} MB of CSV")
+
+    # Each representation is decoded from the text afresh, so its strings count too
+    reader = lambda: csv.DictReader(io.StringIO(text))
+    rows, dict_bytes = measure(lambda: list(reader()))
+    del rows
+    pages, page_bytes = measure(lambda: [to_json(from_csv_row(row)) for row in reader()])
+    del pages
+    columns, column_bytes = measure(lambda: to_columns([from_csv_row(row) for row in reader()]))
+    del columns
+    discounts, model_bytes = measure(lambda: [from_csv_row(row) for row in reader()])
+
+    print(f"{'representation':>22} {'bytes/record':>13}")
+    for name, held in [("csv.DictReader dicts", dict_bytes), ("page JSON dicts", page_bytes),
+                       ("Discount records", model_bytes), ("columnar batch", column_bytes)]:
+        print(f"{name:>22} {held / ROWS:>13.0f}")
+
+    decode_seconds = timed(lambda: [from_csv_row(row) for row in reader()])
+    csv_seconds = timed(lambda: csv.DictWriter(io.StringIO(), fieldnames=CSV_FIELDNAMES)
+                        .writerows(to_csv_row(d) for d in discounts))
+    json_seconds = timed(lambda: json.dumps([to_json(d) for d in discounts], separators=(',', ':')))
+
+    print(f"{'codec':>22} {'seconds':>8} {'us/record':>10}")
+    for name, seconds in [("CSV -> Discount", decode_seconds), ("Discount -> CSV", csv_seconds),
+                          ("Discount -> page JSON", json_seconds)]:
+        print(f"{name:>22} {seconds:>8.2f} {seconds / ROWS * 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import time
+
+from bench_model import synthetic_csv
+from catalog_snapshot import read_snapshot, write_snapshot
+from discount_model import iter_csv
+
+# Catalog sizes to time the build's load step on
+ROW_COUNTS = [1000, 10000, 100000]
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+def main():
+    print(f"{'rows':>8} {'CSV MB':>7} {'snap MB':>8} {'write s':>8} {'CSV load s':>11} {'snap load s':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in ROW_COUNTS:
+            csv_path = os.path.join(tmp, f"catalog_{rows}.csv")
+            snapshot = os.path.join(tmp, f"catalog_{rows}.snapshot")
+            with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(synthetic_csv(rows))
+
+            _, write_seconds = timed(lambda: write_snapshot(iter_csv(csv_path), snapshot, None))
+            from_csv, csv_seconds = timed(lambda: list(iter_csv(csv_path)))
+            from_snapshot, snapshot_seconds = timed(lambda: read_snapshot(snapshot)["discounts"])
+            if from_csv != from_snapshot:
+                raise RuntimeError(f"snapshot of {rows} rows does not match the CSV")
+
+            print(f"{rows:>8} {os.path.getsize(csv_path) / 2**20:>7.1f} {os.path.getsize(snapshot) / 2**20:>8.1f} "
+                  f"{write_seconds:>8.2f} {csv_seconds:>11.3f} {snapshot_seconds:>12.3f} "
+                  f"{csv_seconds / snapshot_seconds:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
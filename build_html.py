@@ -1,108 +1,719 @@
+import ast
 import json
-import csv
+import hashlib
 import os
+import sys
+import textwrap
+
+from asset_minify import COMPRESSED_SUFFIXES, brotli, compress_variants, is_compressible, minify_js, minify_output
+from catalog_delta import apply_delta, delta_path, load_delta
+from catalog_indexes import (GEO_CELL_DEGREES, INDEX_FORMAT, build_filter_index, build_geo_index, build_id_index,
+                             build_search_index, find_duplicate_ids)
+from catalog_snapshot import read_snapshot, snapshot_path
+from discount_model import ROLES, from_csv_row, iter_csv, to_csv_row, to_json
+from image_pipeline import ICON_SOURCE, LOGO_SOURCE, build_images
+from vendor_assets import ASSET_DIR, FONT_CSS_URL, JSPDF_URL, vendor_assets
 
 CSV_FILE = "categorized_discounts.csv"
 OUTPUT_HTML = "vaquero-discounts.html"
 OUTPUT_MANIFEST = "manifest.json"
 OUTPUT_SW = "sw.js"
-
-def load_data_from_csv():
-    discounts = []
+OUTPUT_WORKER = "search-worker.js"
+
+# Content hashes of the last build's inputs and outputs
+BUILD_MANIFEST = ".build-manifest.json"
+# Rows of the last build, patched with the ingest delta on the next one
+BUILD_ROWS_CACHE = ".build-rows.json"
+# Catalog of the last published feed version; the next feed patch is diffed
+# against it (inline builds in between do not publish a version)
+FEED_CATALOG_CACHE = ".feed-catalog.json"
+
+# Split-data builds: a small pointer file names the current content-hashed payload
+DATA_POINTER = "data-version.json"
+DATA_FILE_PREFIX = "discounts."
+
+# Split-data builds also publish one patch per dataset version, so installed
+# clients can catch up from version N without downloading the whole catalog
+FEED_PATCH_PREFIX = "discounts-patch."
+FEED_PATCH_HISTORY = 20
+
+def load_discounts_from_csv():
     try:
-        with open(CSV_FILE, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Transform fields back to what JS expects
-
-                # whoCanRedeem: "A;B" -> ["A", "B"]
-                who = row.get("whoCanRedeem", "").split(";")
-                who = [x.strip() for x in who if x.strip()]
-
-                # tags: "tag" -> ["tag"]
-                tags = [row.get("tags", "")]
-
-                # isFeatured: "True" -> True
-                is_featured = row.get("isFeatured", "False") == "True"
-
-                # Construct object
-                item = {
-                    "id": row["id"],
-                    "businessName": row["businessName"],
-                    "category": row["category"],
-                    "discountAmount": row["discountAmount"],
-                    "whoCanRedeem": who,
-                    "howToRedeem": row["howToRedeem"],
-                    "description": row["description"],
-                    "address": row["address"],
-                    "phone": row["phone"],
-                    "email": row["email"],
-                    "website": row["website"],
-                    "social": "",
-                    "campusProximity": row["campusProximity"],
-                    "isFeatured": is_featured,
-                    "tags": tags,
-                    # New internal fields
-                    "joinDate": row.get("joinDate", ""),
-                    "authorizedBy": row.get("authorizedBy", ""),
-                    "contactTitle": row.get("contactTitle", "")
-                }
-                discounts.append(item)
+        return list(iter_csv(CSV_FILE))
     except FileNotFoundError:
         print(f"Error: {CSV_FILE} not found. Please run fetch_and_process.py first.")
         return []
-    return discounts
 
-discounts_data = load_data_from_csv()
-discounts_json = json.dumps(discounts_data, indent=2)
+def load_catalog_snapshot(csv_hash):
+    """Discounts from the ingest's binary snapshot, or None when it is missing or does not match the CSV."""
+    path = snapshot_path(CSV_FILE)
+    try:
+        snapshot = read_snapshot(path)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"Warning: ignoring {path} ({e}).")
+        return None
+    if snapshot["sourceHash"] != csv_hash:
+        print(f"Warning: {path} does not match {CSV_FILE}; reading the CSV instead.")
+        return None
+    return snapshot["discounts"]
+
+def load_rows_cache(previous):
+    """Rows of the previous build, or None when the cache is missing or stale."""
+    if not previous.get("rowsCache") or file_hash(BUILD_ROWS_CACHE) != previous["rowsCache"]:
+        return None
+    with open(BUILD_ROWS_CACHE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def catalog_hash(discounts):
+    """Short content hash of a page-form catalog, as recorded in the feed."""
+    return content_hash(json.dumps(discounts, separators=(',', ':'), ensure_ascii=False))[:12]
+
+def load_feed_catalog(feed):
+    """Catalog of the published feed version, or None when it is missing or belongs to another version."""
+    if not feed:
+        return None
+    try:
+        with open(FEED_CATALOG_CACHE, 'r', encoding='utf-8') as f:
+            discounts = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return discounts if catalog_hash(discounts) == feed["hash"] else None
+
+def load_discounts(previous, csv_hash):
+    """
+    The catalog from the binary snapshot when it matches the CSV, else the last
+    build's rows patched with the ingest delta when it lines up, else the CSV.
+    """
+    discounts = load_catalog_snapshot(csv_hash)
+    if discounts is not None:
+        return discounts
+
+    delta = load_delta(CSV_FILE)
+    rows = None
+    if (delta and delta["base"] and delta["base"] == previous["inputs"].get(CSV_FILE)
+            and delta["target"] == csv_hash):
+        rows = load_rows_cache(previous)
+    if rows is not None:
+        print(f"Applying {delta_path(CSV_FILE)}: {len(delta['added'])} added, "
+              f"{len(delta['removed'])} removed, {len(delta['modified'])} modified.")
+        return [from_csv_row(row) for row in apply_delta(rows, delta)]
+    return load_discounts_from_csv()
 
 # --- MANIFEST.JSON ---
-manifest_content = """{
-  "name": "Vaquero Discounts",
-  "short_name": "VaqueroDiscounts",
-  "start_url": "./vaquero-discounts.html",
-  "display": "standalone",
-  "background_color": "#F5F5F7",
-  "theme_color": "#F05023",
-  "icons": [
-    {
-      "src": "icon.png",
-      "sizes": "192x192",
-      "type": "image/png"
-    },
-    {
-      "src": "icon.png",
-      "sizes": "512x512",
-      "type": "image/png"
-    }
-  ]
-}"""
+WEB_APP_MANIFEST = {
+    "name": "Vaquero Discounts",
+    "short_name": "VaqueroDiscounts",
+    "start_url": "./vaquero-discounts.html",
+    "display": "standalone",
+    "background_color": "#F5F5F7",
+    "theme_color": "#F05023"
+}
+
+def render_manifest(icons):
+    """manifest.json with the icon entries produced by the image pipeline."""
+    return json.dumps({**WEB_APP_MANIFEST, "icons": icons}, indent=2)
 
 # --- SW.JS ---
-sw_content = """const CACHE_NAME = 'vaquero-v3';
-const ASSETS = [
-  './',
-  './vaquero-discounts.html',
-  './manifest.json',
-  './icon.png',
-  './utrgv-logo.png'
+# Page shell; images and vendored files are added from the build's outputs
+SW_ASSETS = [
+    './',
+    './vaquero-discounts.html',
+    './manifest.json',
+    './search-worker.js'
+]
+
+# Third-party hosts cached at runtime (Google Fonts CSS and files, jsPDF)
+SW_RUNTIME_HOSTS = ["fonts.googleapis.com", "fonts.gstatic.com", "cdnjs.cloudflare.com"]
+
+def find_missing_assets(urls, outputs):
+    """URLs that are neither produced by this build nor present on disk."""
+    missing = []
+    for url in urls:
+        path = OUTPUT_HTML if url == './' else url[2:] if url.startswith('./') else url
+        if url.startswith('data:') or path in outputs or os.path.exists(path):
+            continue
+        missing.append(url)
+    return missing
+
+def precache_entries(assets, outputs):
+    """(url, revision) pairs for the service worker; revisions are content hashes."""
+    entries = []
+    for asset in assets:
+        path = OUTPUT_HTML if asset == './' else asset[2:]
+        if path in outputs:
+            revision = content_hash(outputs[path])
+        else:
+            revision = file_hash(path)
+        entries.append((asset, revision[:12]))
+    return entries
+
+def render_sw(entries):
+    precache_lines = ",\n".join(f"  {{ url: '{url}', revision: '{revision}' }}" for url, revision in entries)
+    cache_version = content_hash("".join(url + revision for url, revision in entries))[:12]
+    runtime_hosts = json.dumps(SW_RUNTIME_HOSTS)
+    return f"""// Generated by build_html.py; the cache name changes whenever any precached asset does
+const CACHE_PREFIX = 'vaquero-';
+const CACHE_NAME = CACHE_PREFIX + '{cache_version}';
+const RUNTIME_CACHE = CACHE_PREFIX + 'runtime';
+const RUNTIME_MAX_ENTRIES = 40;
+const PRECACHE = [
+{precache_lines}
 ];
+const RUNTIME_HOSTS = {runtime_hosts};
+const DATA_POINTER = '{DATA_POINTER}';
+const ASSET_PATH = '/{ASSET_DIR}/';
+const MANIFEST_KEY = '__precache-manifest';
+
+// Reuses unchanged entries from the previous precache, so an update only
+// downloads the assets whose revision actually changed
+self.addEventListener('install', (e) => {{
+  e.waitUntil((async () => {{
+    const cache = await caches.open(CACHE_NAME);
+    const previous = await findPreviousPrecache();
+    await Promise.all(PRECACHE.map(async ({{ url, revision }}) => {{
+      if (previous && previous.revisions[url] === revision) {{
+        const cached = await previous.cache.match(url);
+        if (cached) return cache.put(url, cached);
+      }}
+      const response = await fetch(new Request(url, {{ cache: 'reload' }}));
+      if (!response.ok) throw new Error(`Precache failed for ${{url}}: ${{response.status}}`);
+      return cache.put(url, response);
+    }}));
+    const revisions = Object.fromEntries(PRECACHE.map(({{ url, revision }}) => [url, revision]));
+    await cache.put(MANIFEST_KEY, new Response(JSON.stringify(revisions)));
+    await self.skipWaiting();
+  }})());
+}});
+
+async function findPreviousPrecache() {{
+  for (const name of await caches.keys()) {{
+    if (!name.startsWith(CACHE_PREFIX) || name === CACHE_NAME || name === RUNTIME_CACHE) continue;
+    const cache = await caches.open(name);
+    const manifest = await cache.match(MANIFEST_KEY);
+    if (manifest) return {{ cache, revisions: await manifest.json() }};
+  }}
+  return null;
+}}
+
+self.addEventListener('activate', (e) => {{
+  e.waitUntil((async () => {{
+    for (const name of await caches.keys()) {{
+      if (name.startsWith(CACHE_PREFIX) && name !== CACHE_NAME && name !== RUNTIME_CACHE) {{
+        await caches.delete(name);
+      }}
+    }}
+    await self.clients.claim();
+  }})());
+}});
+
+self.addEventListener('fetch', (e) => {{
+  const request = e.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+
+  if (url.origin === self.location.origin) {{
+    if (url.pathname.endsWith('/' + DATA_POINTER)) {{
+      e.respondWith(staleWhileRevalidate(request));
+    }} else if (/\/discounts[.-][^/]*\.json$/.test(url.pathname) || url.pathname.includes(ASSET_PATH)) {{
+      // Snapshots, patches and vendored files are content-addressed and never change;
+      // the ones left out of the precache (jsPDF) are kept from their first use
+      e.respondWith(cacheFirst(request));
+    }} else {{
+      e.respondWith(caches.match(request, {{ ignoreSearch: request.mode === 'navigate' }})
+        .then((response) => response || fetch(request)));
+    }}
+  }} else if (RUNTIME_HOSTS.includes(url.hostname)) {{
+    e.respondWith(url.hostname === 'fonts.googleapis.com' ? staleWhileRevalidate(request) : cacheFirst(request));
+  }}
+}});
+
+async function cacheFirst(request) {{
+  const cached = await caches.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok || response.type === 'opaque') await putRuntime(request, response.clone());
+  return response;
+}}
+
+async function staleWhileRevalidate(request) {{
+  // The runtime copy is the freshest; the precache copy only covers first launch offline
+  const runtime = await caches.open(RUNTIME_CACHE);
+  const cached = (await runtime.match(request, {{ ignoreSearch: true }})) || (await caches.match(request, {{ ignoreSearch: true }}));
+  const update = fetch(request).then(async (response) => {{
+    if (response.ok) await putRuntime(request, response.clone());
+    return response;
+  }});
+  if (cached) {{
+    update.catch(() => {{}});
+    return cached;
+  }}
+  return update;
+}}
+
+async function putRuntime(request, response) {{
+  const cache = await caches.open(RUNTIME_CACHE);
+  await cache.put(request, response);
+  const keys = await cache.keys();
+  for (const key of keys.slice(0, Math.max(0, keys.length - RUNTIME_MAX_ENTRIES))) {{
+    await cache.delete(key);
+  }}
+}}
+"""
+
+# --- SEARCH ENGINE ---
+# Plain JS (no f-string escaping); answers queries from the build-time search index
+SEARCH_ENGINE_JS = r"""
+        function normalizeText(text) {
+            return (text || '').normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+        }
+
+        function tokenize(text) {
+            return normalizeText(text).match(/[a-z0-9]+/g) || [];
+        }
+
+        // Client-side twin of catalog_indexes.build_search_index, for patched catalogs
+        function buildSearchIndex(discounts) {
+            const postings = new Map();
+            discounts.forEach((d, position) => {
+                const text = [d.businessName, d.description, (d.tags || []).join(' ')].join(' ');
+                for (const token of new Set(tokenize(text))) {
+                    if (!postings.has(token)) postings.set(token, []);
+                    postings.get(token).push(position);
+                }
+            });
+            const tokens = Array.from(postings.keys()).sort();
+            return { tokens, postings: tokens.map(token => postings.get(token)) };
+        }
+
+        // index.tokens is sorted, so the tokens sharing a prefix form one run found
+        // by binary search. Prefix results are memoized: each keystroke typically
+        // costs one lookup plus a set intersection, never a scan of the catalog.
+        function createSearcher(index) {
+            const cache = new Map();
+
+            function lookup(prefix) {
+                let positions = cache.get(prefix);
+                if (positions) return positions;
+
+                const tokens = index.tokens;
+                let lo = 0, hi = tokens.length;
+                while (lo < hi) {
+                    const mid = (lo + hi) >> 1;
+                    if (tokens[mid] < prefix) lo = mid + 1; else hi = mid;
+                }
+
+                positions = new Set();
+                for (let i = lo; i < tokens.length && tokens[i].startsWith(prefix); i++) {
+                    for (const p of index.postings[i]) positions.add(p);
+                }
+                if (cache.size > 1000) cache.clear();
+                cache.set(prefix, positions);
+                return positions;
+            }
+
+            // Returns the positions matching every query term, or null for an empty query
+            return function search(query) {
+                const terms = tokenize(query);
+                if (terms.length === 0) return null;
+
+                const sets = terms.map(lookup).sort((a, b) => a.size - b.size);
+                const result = new Set();
+                for (const p of sets[0]) {
+                    if (sets.every(set => set.has(p))) result.add(p);
+                }
+                return result;
+            };
+        }
+"""
 
-self.addEventListener('install', (e) => {
-  e.waitUntil(
-    caches.open(CACHE_NAME).then((cache) => cache.addAll(ASSETS))
-  );
-});
-
-self.addEventListener('fetch', (e) => {
-  e.respondWith(
-    caches.match(e.request).then((response) => response || fetch(e.request))
-  );
-});
+# --- GEO ENGINE ---
+# Plain JS; answers "near me" queries from the build-time geo index
+GEO_ENGINE_JS = r"""
+        const MILES_PER_DEGREE = 69.09;
+
+        function distanceMiles(lat1, lng1, lat2, lng2) {
+            const rad = Math.PI / 180;
+            const h = Math.sin((lat2 - lat1) * rad / 2) ** 2 +
+                Math.cos(lat1 * rad) * Math.cos(lat2 * rad) * Math.sin((lng2 - lng1) * rad / 2) ** 2;
+            return 2 * 3958.8 * Math.asin(Math.sqrt(h));
+        }
+
+        // Client-side twin of catalog_indexes.build_geo_index, for patched catalogs
+        function buildGeoIndex(discounts, cell) {
+            const cells = {};
+            discounts.forEach((d, position) => {
+                if (d.lat == null || d.lng == null) return;
+                const key = Math.floor(d.lat / cell) + ':' + Math.floor(d.lng / cell);
+                (cells[key] || (cells[key] = [])).push(position);
+            });
+            return { cell, cells };
+        }
+
+        // Radius and nearest-N queries over the grid. Only the cells that can
+        // hold an answer are visited, so a query costs the discounts near the
+        // visitor rather than a pass over the whole catalog.
+        function createGeoQuery(index, discounts) {
+            const cell = index.cell;
+            const occupied = Object.keys(index.cells).map(key => key.split(':').map(Number));
+            let minRow = Infinity, maxRow = -Infinity, minCol = Infinity, maxCol = -Infinity;
+            for (const [row, col] of occupied) {
+                minRow = Math.min(minRow, row); maxRow = Math.max(maxRow, row);
+                minCol = Math.min(minCol, col); maxCol = Math.max(maxCol, col);
+            }
+            // Longitude degrees shrink away from the equator; the cell edge
+            // furthest from it gives the narrowest cell anywhere in the grid
+            const widestLat = Math.min(89, Math.max(Math.abs(minRow * cell), Math.abs((maxRow + 1) * cell)));
+            const cellMiles = cell * MILES_PER_DEGREE * Math.cos(widestLat * Math.PI / 180);
+            const byMiles = (a, b) => a.miles - b.miles;
+
+            function visit(row, col, lat, lng, found) {
+                const positions = index.cells[row + ':' + col];
+                if (!positions) return;
+                for (const p of positions) {
+                    found.push({ position: p, miles: distanceMiles(lat, lng, discounts[p].lat, discounts[p].lng) });
+                }
+            }
+
+            // Every discount within miles of (lat, lng) as {position, miles}, nearest first
+            function withinRadius(lat, lng, miles) {
+                const dLat = miles / MILES_PER_DEGREE;
+                const dLng = miles / (MILES_PER_DEGREE * Math.cos(Math.min(89, Math.abs(lat) + dLat) * Math.PI / 180));
+                const r0 = Math.max(minRow, Math.floor((lat - dLat) / cell));
+                const r1 = Math.min(maxRow, Math.floor((lat + dLat) / cell));
+                const c0 = Math.max(minCol, Math.floor((lng - dLng) / cell));
+                const c1 = Math.min(maxCol, Math.floor((lng + dLng) / cell));
+                const found = [];
+                if (r0 > r1 || c0 > c1) return found;
+                if ((r1 - r0 + 1) * (c1 - c0 + 1) > occupied.length) {
+                    // A box wider than the catalog: walking the occupied cells is cheaper
+                    for (const [row, col] of occupied) {
+                        if (row >= r0 && row <= r1 && col >= c0 && col <= c1) visit(row, col, lat, lng, found);
+                    }
+                } else {
+                    for (let row = r0; row <= r1; row++) {
+                        for (let col = c0; col <= c1; col++) visit(row, col, lat, lng, found);
+                    }
+                }
+                return found.filter(hit => hit.miles <= miles).sort(byMiles);
+            }
+
+            // The n discounts closest to (lat, lng), nearest first. Rings of cells
+            // are searched outward from the visitor's cell and the search stops
+            // once no unvisited cell can hold anything closer than the n-th best.
+            function nearest(lat, lng, n, maxMiles = Infinity) {
+                const row0 = Math.floor(lat / cell), col0 = Math.floor(lng / cell);
+                const lastRing = Math.max(row0 - minRow, maxRow - row0, col0 - minCol, maxCol - col0);
+                let found = [];
+                for (let k = 0; k <= lastRing; k++) {
+                    for (let row = Math.max(row0 - k, minRow); row <= Math.min(row0 + k, maxRow); row++) {
+                        if (row === row0 - k || row === row0 + k) {
+                            for (let col = Math.max(col0 - k, minCol); col <= Math.min(col0 + k, maxCol); col++) {
+                                visit(row, col, lat, lng, found);
+                            }
+                        } else {
+                            if (col0 - k >= minCol) visit(row, col0 - k, lat, lng, found);
+                            if (col0 + k <= maxCol) visit(row, col0 + k, lat, lng, found);
+                        }
+                    }
+                    // Cells outside ring k are at least k cell widths away
+                    const reach = k * cellMiles;
+                    if (found.length >= n) {
+                        found = found.sort(byMiles).slice(0, n);
+                        if (found[n - 1].miles <= reach) break;
+                    }
+                    if (reach >= maxMiles) break;
+                }
+                return found.filter(hit => hit.miles <= maxMiles).sort(byMiles).slice(0, n);
+            }
+
+            return { withinRadius, nearest };
+        }
+"""
+
+# --- FILTER ENGINE ---
+# Plain JS; combines the build-time category and role bitsets
+FILTER_ENGINE_JS = r"""
+        function decodeBase64(text) {
+            const binary = atob(text);
+            const bytes = new Uint8Array(binary.length);
+            for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+            return bytes;
+        }
+
+        function encodeBase64(bytes) {
+            let binary = '';
+            for (let i = 0; i < bytes.length; i += 0x8000) {
+                binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+            }
+            return btoa(binary);
+        }
+
+        // Bitsets are little-endian uint32 words
+        function decodeBitset(text) {
+            const bytes = decodeBase64(text);
+            const view = new DataView(bytes.buffer);
+            const words = new Uint32Array(bytes.length >> 2);
+            for (let w = 0; w < words.length; w++) words[w] = view.getUint32(w * 4, true);
+            return words;
+        }
+
+        function encodeBitset(words) {
+            const view = new DataView(new ArrayBuffer(words.length * 4));
+            words.forEach((word, w) => view.setUint32(w * 4, word, true));
+            return encodeBase64(new Uint8Array(view.buffer));
+        }
+
+        // Client-side twin of catalog_indexes.build_filter_index, for patched catalogs
+        function buildFilterIndex(discounts, roles) {
+            const categories = Array.from(new Set(discounts.map(d => d.category))).sort((a, b) => (a < b ? -1 : a > b ? 1 : 0));
+            const codes = new Map(categories.map((category, code) => [category, code]));
+            const words = (discounts.length + 31) >> 5;
+            const byRole = roles.map(() => new Uint32Array(words));
+            const byCategory = categories.map(() => new Uint32Array(words));
+            discounts.forEach((d, position) => {
+                const word = position >>> 5, bit = 1 << (position & 31);
+                byCategory[codes.get(d.category)][word] |= bit;
+                roles.forEach((role, i) => {
+                    if (d.whoCanRedeem.includes(role)) byRole[i][word] |= bit;
+                });
+            });
+            return {
+                roles,
+                categories,
+                byRole: byRole.map(encodeBitset),
+                byCategory: byCategory.map(encodeBitset)
+            };
+        }
+
+        // Decodes the bitsets once; each query then costs one pass over
+        // (catalog size / 32) words, whatever the number of discounts matched.
+        function createFilterEngine(index, count) {
+            const words = (count + 31) >>> 5;
+            const byRole = index.byRole.map(decodeBitset);
+            const byCategory = index.byCategory.map(decodeBitset);
+            const none = new Uint32Array(words);
+            // Every position, with the bits past the last one left clear so they are never counted
+            const all = new Uint32Array(words).fill(0xFFFFFFFF);
+            if (count & 31) all[words - 1] = 2 ** (count & 31) - 1;
+
+            function roleBits(roles) {
+                if (roles.length === 0) return all;
+                const bits = new Uint32Array(words);
+                for (const role of roles) {
+                    const set = byRole[index.roles.indexOf(role)] || none;
+                    for (let w = 0; w < words; w++) bits[w] |= set[w];
+                }
+                return bits;
+            }
+
+            function categoryBits(category) {
+                return category ? byCategory[index.categories.indexOf(category)] || none : all;
+            }
+
+            function intersect(a, b) {
+                const bits = new Uint32Array(words);
+                for (let w = 0; w < words; w++) bits[w] = a[w] & b[w];
+                return bits;
+            }
+
+            function popcount(x) {
+                x -= (x >>> 1) & 0x55555555;
+                x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+                return (Math.imul((x + (x >>> 4)) & 0x0F0F0F0F, 0x01010101) >>> 24);
+            }
+
+            function countAll(a, b, c) {
+                let n = 0;
+                for (let w = 0; w < words; w++) n += popcount(a[w] & b[w] & c[w]);
+                return n;
+            }
+
+            return {
+                // Bitset of the positions in category that any of roles can redeem,
+                // or null when neither filter is set
+                match(category, roles) {
+                    if (!category && roles.length === 0) return null;
+                    return intersect(roleBits(roles), categoryBits(category));
+                },
+
+                // Bitset of an iterable of positions
+                toBits(positions) {
+                    const bits = new Uint32Array(words);
+                    for (const p of positions) bits[p >>> 5] |= 1 << (p & 31);
+                    return bits;
+                },
+
+                intersect,
+
+                // How many of the candidates (a bitset, null for all) each chip and
+                // toggle would leave: categories under the selected roles, roles
+                // under the selected category, so choosing one never zeroes its siblings.
+                facetCounts(candidates, category, roles) {
+                    const base = candidates || all;
+                    const withRoles = roleBits(roles), withCategory = categoryBits(category);
+                    const counts = { categories: {}, roles: {} };
+                    index.categories.forEach((name, i) => { counts.categories[name] = countAll(base, withRoles, byCategory[i]); });
+                    index.roles.forEach((name, i) => { counts.roles[name] = countAll(base, withCategory, byRole[i]); });
+                    return counts;
+                }
+            };
+        }
+
+        function hasBit(bits, position) {
+            return (bits[position >>> 5] & (1 << (position & 31))) !== 0;
+        }
+"""
+
+# --- QUERY ENGINE ---
+# Plain JS on top of the three engines above; answers a whole filter state.
+# Shared by the page and the search worker, so both give the same answers.
+QUERY_ENGINE_JS = r"""
+        // Client-side twin of build_html.build_indexes, for catalogs patched on the page
+        function buildIndexes(discounts, roles, cellDegrees) {
+            return {
+                byId: buildIdIndex(discounts),
+                search: buildSearchIndex(discounts),
+                geo: buildGeoIndex(discounts, cellDegrees),
+                filters: buildFilterIndex(discounts, roles)
+            };
+        }
+
+        function buildIdIndex(discounts) {
+            const byId = {};
+            discounts.forEach((d, i) => { byId[d.id] = i; });
+            return byId;
+        }
+
+        // Builds the per-catalog query state once. discounts only needs
+        // businessName, lat and lng; indexes is CATALOG_INDEXES.
+        function createCatalogQuery(discounts, indexes) {
+            const search = createSearcher(indexes.search);
+            const geo = createGeoQuery(indexes.geo, discounts);
+            const filters = createFilterEngine(indexes.filters, discounts.length);
+            // Catalog positions ordered by business name
+            const sortedPositions = discounts.map((d, i) => i)
+                .sort((a, b) => discounts[a].businessName.localeCompare(discounts[b].businessName));
+
+            // Discounts near origin as {position, miles}, nearest first; null without an origin.
+            // With no radius, discounts that have no address to place (online, valleywide) come last.
+            function nearby(origin, radiusMiles) {
+                if (!origin) return null;
+                if (radiusMiles) return geo.withinRadius(origin.lat, origin.lng, radiusMiles);
+                const hits = geo.nearest(origin.lat, origin.lng, discounts.length);
+                discounts.forEach((d, i) => {
+                    if (d.lat == null || d.lng == null) hits.push({ position: i, miles: Infinity });
+                });
+                return hits;
+            }
+
+            // query: {search, category, roles, origin, radiusMiles, sortBy}, sortBy being
+            // 'name' or 'distance' from origin. Returns the matching positions in that
+            // order, and each chip's and toggle's count for the search and origin.
+            function run(query) {
+                const matches = query.search ? search(query.search) : null;
+                const near = nearby(query.origin, query.radiusMiles);
+                // Category AND (any selected role), combined word by word
+                const allowed = filters.match(query.category, query.roles);
+                const keep = i => (!matches || matches.has(i)) && (!allowed || hasBit(allowed, i));
+
+                let positions;
+                if (!near) {
+                    positions = sortedPositions.filter(keep);
+                } else if (query.sortBy === 'distance') {
+                    positions = near.map(hit => hit.position).filter(keep);
+                } else {
+                    const inRange = new Set(near.map(hit => hit.position));
+                    positions = sortedPositions.filter(i => inRange.has(i) && keep(i));
+                }
+
+                let candidates = matches ? filters.toBits(matches) : null;
+                if (near) {
+                    const nearBits = filters.toBits(near.map(hit => hit.position));
+                    candidates = candidates ? filters.intersect(candidates, nearBits) : nearBits;
+                }
+                return { positions, counts: filters.facetCounts(candidates, query.category, query.roles) };
+            }
+
+            return { run, sortedPositions };
+        }
+"""
+
+# --- SEARCH WORKER ---
+# Plain JS; the message loop of search-worker.js. The page posts
+#   {type: 'catalog', catalogSeq, discounts, indexes, roles, cellDegrees} whenever
+#   its catalog changes (indexes null when they still have to be built), then
+#   {type: 'query', seq, query} per render.
+# It gets back {type: 'catalog', catalogSeq, sortedPositions, indexes} once the
+# catalog is ready (indexes only when built here), and {type: 'result', seq, result}
+# per query, with result as returned by createCatalogQuery's run.
+WORKER_JS = r"""
+let catalogQuery = null;
+let pending = null;
+
+self.onmessage = event => {
+    const message = event.data;
+    if (message.type === 'catalog') {
+        const indexes = message.indexes || buildIndexes(message.discounts, message.roles, message.cellDegrees);
+        catalogQuery = createCatalogQuery(message.discounts, indexes);
+        self.postMessage({
+            type: 'catalog',
+            catalogSeq: message.catalogSeq,
+            sortedPositions: catalogQuery.sortedPositions,
+            indexes: message.indexes ? null : indexes
+        });
+        return;
+    }
+    // Queries that arrive while one is waiting replace it, so a burst of
+    // keystrokes is answered once, for the newest state
+    const idle = pending === null;
+    pending = message;
+    if (idle) setTimeout(answer, 0);
+};
+
+function answer() {
+    const { seq, query } = pending;
+    pending = null;
+    const result = catalogQuery ? catalogQuery.run(query) : { positions: [], counts: null };
+    self.postMessage({ type: 'result', seq, result });
+}
 """
 
 # --- HTML ---
-html_content = f"""<!DOCTYPE html>
+# Third-party font stylesheet and PDF library, used unless --self-host-assets vendors them
+CDN_ASSETS = {
+    "head": f"""<link rel="preconnect" href="https://fonts.googleapis.com">
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <link href="{FONT_CSS_URL}" rel="stylesheet">""",
+    "jspdfUrl": JSPDF_URL,
+    "files": {}
+}
+
+def self_hosted_assets(vendored):
+    """Page assets for the files returned by vendor_assets()."""
+    head = f"<style>\n{vendored['fontCss']}\n    </style>"
+    if vendored["preload"]:
+        head = (f'<link rel="preload" href="{vendored["preload"]}" as="font" type="font/woff2" crossorigin>\n    '
+                + head)
+    return {"head": head, "jspdfUrl": vendored["jspdfUrl"], "files": vendored["files"]}
+
+def render_logo(logo):
+    """Header logo markup: a <picture> offering the modern formats when the pipeline made them."""
+    srcset = f' srcset="{logo["srcset"]}"' if logo["srcset"] else ''
+    img = (f'<img src="{logo["src"]}"{srcset} width="{logo["width"]}" height="{logo["height"]}" '
+           f'alt="UTRGV Logo" class="utrgv-logo-img">')
+    if not logo["sources"]:
+        return img
+    sources = "".join(f'<source type="{source["type"]}" srcset="{source["srcset"]}">' for source in logo["sources"])
+    return f"<picture>{sources}{img}</picture>"
+
+def with_images(assets, images):
+    """Page assets plus the image pipeline's output."""
+    return dict(assets, images=images, files={**assets["files"], **images["files"]})
+
+def render_html(data_js, assets):
+    return f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -112,15 +723,10 @@ html_content = f"""<!DOCTYPE html>
 
     <!-- PWA -->
     <link rel="manifest" href="manifest.json">
-    <link rel="apple-touch-icon" href="icon.png">
+    <link rel="apple-touch-icon" href="{assets['images']['appleTouchIcon']}">
 
     <!-- Fonts -->
-    <link rel="preconnect" href="https://fonts.googleapis.com">
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-    <link href="https://fonts.googleapis.com/css2?family=Open+Sans:ital,wght@0,300;0,400;0,600;0,700;0,800;1,400&display=swap" rel="stylesheet">
-
-    <!-- PDF Library -->
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/jspdf/2.5.1/jspdf.umd.min.js"></script>
+    {assets['head']}
 
     <style>
         :root {{
@@ -406,6 +1012,9 @@ html_content = f"""<!DOCTYPE html>
             box-shadow: 0 2px 8px rgba(240, 80, 35, 0.3);
         }}
 
+        .facet-count {{ font-weight: 400; opacity: 0.75; }}
+        .chip.empty:not(.active), .toggle-btn.empty:not(.active) {{ opacity: 0.5; }}
+
         /* Eligibility Toggles */
         .eligibility-container {{
             display: flex;
@@ -486,6 +1095,7 @@ html_content = f"""<!DOCTYPE html>
             flex-direction: column;
             position: relative;
         }}
+        .card[hidden] {{ display: none; }}
         .card:hover {{
             transform: translateY(-4px);
             box-shadow: 0 12px 24px rgba(0,0,0,0.08);
@@ -747,7 +1357,7 @@ html_content = f"""<!DOCTYPE html>
         <div class="header-top">
             <div class="header-logo-container">
                 <!-- UTRGV Logo Image -->
-                <img src="utrgv-logo.png" alt="UTRGV Logo" class="utrgv-logo-img">
+                {render_logo(assets['images']['logo'])}
                 <div style="color:white; font-weight:800; font-size:24px; line-height:1;">|</div>
                 <!-- 10 Years Placeholder -->
                  <div style="font-weight:900; font-size:16px; margin-left:10px; line-height:1.1; text-align:center;">
@@ -801,10 +1411,22 @@ html_content = f"""<!DOCTYPE html>
 
             <span class="filter-label">Filter by Eligibility</span>
             <div class="eligibility-container" id="eligibilityContainer">
-                <button class="toggle-btn" data-value="Students">Students</button>
-                <button class="toggle-btn" data-value="Faculty">Faculty</button>
-                <button class="toggle-btn" data-value="Staff">Staff</button>
-                <button class="toggle-btn" data-value="Alumni">Alumni</button>
+                <button class="toggle-btn" data-value="Students">Students <span class="facet-count"></span></button>
+                <button class="toggle-btn" data-value="Faculty">Faculty <span class="facet-count"></span></button>
+                <button class="toggle-btn" data-value="Staff">Staff <span class="facet-count"></span></button>
+                <button class="toggle-btn" data-value="Alumni">Alumni <span class="facet-count"></span></button>
+            </div>
+
+            <span class="filter-label">Near Me</span>
+            <div class="eligibility-container">
+                <button class="toggle-btn" id="nearMeBtn">Near me</button>
+                <select class="toggle-btn" id="radiusSelect" aria-label="Distance">
+                    <option value="1">Within 1 mi</option>
+                    <option value="5">Within 5 mi</option>
+                    <option value="10">Within 10 mi</option>
+                    <option value="25">Within 25 mi</option>
+                    <option value="">Any distance</option>
+                </select>
             </div>
 
             <button id="clearFilters" class="clear-filters" style="display: none;">Reset all filters</button>
@@ -877,7 +1499,7 @@ html_content = f"""<!DOCTYPE html>
 
     <script>
         // --- DATA ---
-        const DISCOUNTS = {discounts_json};
+        {data_js}
 
         // --- CONFIG ---
         // Updated based on actual CSV data
@@ -896,6 +1518,8 @@ html_content = f"""<!DOCTYPE html>
             search: "",
             category: null,
             eligibility: new Set(),
+            origin: null, // {{lat, lng}} from the geolocation API while "Near me" is on
+            radiusMiles: 10, // null: any distance
             currentModalItem: null
         }};
 
@@ -905,6 +1529,8 @@ html_content = f"""<!DOCTYPE html>
             categories: document.getElementById('categoryContainer'),
             eligibility: document.getElementById('eligibilityContainer'),
             clearBtn: document.getElementById('clearFilters'),
+            nearMe: document.getElementById('nearMeBtn'),
+            radius: document.getElementById('radiusSelect'),
             featuredSection: document.getElementById('featuredSection'),
             featuredGrid: document.getElementById('featuredGrid'),
             resultsGrid: document.getElementById('resultsGrid'),
@@ -928,9 +1554,324 @@ html_content = f"""<!DOCTYPE html>
         function init() {{
             loadState();
             renderFilters();
-            renderAll();
             setupListeners();
             registerSW();
+            loadCatalog()
+                .then(prepareCatalogView)
+                .catch(err => console.log('Failed to load discounts', err))
+                .then(renderAll);
+        }}
+
+        // Derived view state; rebuilt whenever the catalog itself is replaced.
+        // The query engine is not built here: the worker builds its own, and the
+        // inline one is only built on first use (see inlineQuery).
+        function prepareCatalogView() {{
+            catalogQuery = null;
+            sortedPositions = [];
+            cardNodes.length = 0;
+            visiblePositions = new Set();
+            cardsReordered = false;
+            featuredRendered = false;
+            els.resultsGrid.replaceChildren();
+            setupWindowedGrid();
+            startSearchWorker();
+        }}
+
+        // --- SEARCH WORKER ---
+        // Where workers are available, queries are answered in search-worker.js and
+        // the page only applies the results, so typing and scrolling never wait on
+        // filtering. Without one (file:// pages, old browsers, a worker that fails
+        // to load), queries are answered inline as before.
+        let searchWorker = null;
+        let querySeq = 0; // only the answer to the newest query is applied
+        let catalogSeq = 0; // likewise for the catalog the worker has prepared
+
+        function startSearchWorker() {{
+            if (!searchWorker) {{
+                if (typeof Worker === 'undefined') return;
+                try {{
+                    searchWorker = new Worker('search-worker.js');
+                }} catch (err) {{
+                    console.log('Search worker unavailable, filtering inline', err);
+                    return;
+                }}
+                searchWorker.onmessage = e => {{
+                    const message = e.data;
+                    if (message.type === 'result') {{
+                        if (message.seq === querySeq) applyResults(message.result);
+                    }} else if (message.catalogSeq === catalogSeq) {{
+                        sortedPositions = message.sortedPositions;
+                        if (message.indexes) useIndexes(message.indexes);
+                    }}
+                }};
+                searchWorker.onerror = err => {{
+                    console.log('Search worker failed, filtering inline', err);
+                    searchWorker.terminate();
+                    searchWorker = null;
+                    renderAll();
+                }};
+            }}
+            // Queries only read the name and location, so the cards' text stays on this
+            // side, unless the worker has to build the indexes from the records first
+            const indexed = Boolean(CATALOG_INDEXES.search);
+            const discounts = indexed
+                ? DISCOUNTS.map(d => ({{ businessName: d.businessName, lat: d.lat, lng: d.lng }}))
+                : DISCOUNTS;
+            searchWorker.postMessage({{
+                type: 'catalog',
+                catalogSeq: ++catalogSeq,
+                discounts,
+                indexes: indexed ? CATALOG_INDEXES : null,
+                roles: ROLES,
+                cellDegrees: GEO_CELL_DEGREES
+            }});
+        }}
+
+        // Split builds ship the catalog as a separate, content-hashed file.
+        // A stored copy renders immediately; the feed is checked in the background.
+        function loadCatalog() {{
+            if (!DATA_POINTER_URL) return Promise.resolve();
+            return readLocalCatalog().then(local => {{
+                const update = fetchJSON(DATA_POINTER_URL, {{ cache: 'no-cache' }})
+                    .then(pointer => syncCatalog(local, pointer));
+                if (!local) return update.then(useCatalog);
+
+                update
+                    .then(catalog => {{
+                        if (catalog === local) return;
+                        useCatalog(catalog);
+                        prepareCatalogView();
+                        renderAll();
+                    }})
+                    .catch(err => console.log('Catalog sync failed, using stored copy', err));
+                useCatalog(local);
+            }});
+        }}
+
+        let catalogVersion = null;
+
+        // A catalog patched on the page arrives without indexes; only the id lookup
+        // is built here, the rest by the worker (or inlineQuery without one)
+        function useCatalog(catalog) {{
+            catalogVersion = catalog.version;
+            DISCOUNTS.length = 0;
+            for (const d of catalog.discounts) DISCOUNTS.push(d);
+            Object.keys(CATALOG_INDEXES).forEach(key => delete CATALOG_INDEXES[key]);
+            Object.assign(CATALOG_INDEXES, catalog.indexes || {{ byId: buildIdIndex(catalog.discounts) }});
+        }}
+
+        // Indexes built after the catalog was loaded, kept with its stored copy
+        function useIndexes(indexes) {{
+            Object.assign(CATALOG_INDEXES, indexes);
+            if (catalogVersion !== null) storeIndexes(catalogVersion, indexes);
+        }}
+
+        function fetchJSON(url, options) {{
+            return fetch(url, options).then(res => {{
+                if (!res.ok) throw new Error(`${{url}}: HTTP ${{res.status}}`);
+                return res.json();
+            }});
+        }}
+
+        // --- DELTA SYNC ---
+        // Installed copies keep the catalog locally with its dataset version and
+        // apply the per-version patches published by the build, falling back to
+        // the full snapshot when they are too far behind.
+        const MAX_PATCH_CHAIN = 10;
+
+        function syncCatalog(local, pointer) {{
+            if (local && local.version === pointer.version) return local;
+
+            const gap = local ? pointer.version - local.version : Infinity;
+            if (gap > 0 && gap <= MAX_PATCH_CHAIN && local.version >= pointer.patchFloor) {{
+                const urls = [];
+                for (let v = local.version + 1; v <= pointer.version; v++) {{
+                    urls.push(pointer.patchUrl.replace('{{version}}', v));
+                }}
+                return Promise.all(urls.map(url => fetchJSON(url)))
+                    .then(patches => {{
+                        const discounts = patches.reduce(applyPatch, local.discounts);
+                        const catalog = {{ version: pointer.version, discounts, indexes: null }};
+                        storePatches(catalog, patches);
+                        return catalog;
+                    }})
+                    .catch(err => {{
+                        console.log('Patch sync failed, loading snapshot', err);
+                        return fetchSnapshot(pointer);
+                    }});
+            }}
+            return fetchSnapshot(pointer);
+        }}
+
+        function fetchSnapshot(pointer) {{
+            return fetchJSON(pointer.url).then(payload => {{
+                const catalog = {{ version: pointer.version, discounts: payload.discounts, indexes: payload.indexes }};
+                storeSnapshot(catalog);
+                return catalog;
+            }});
+        }}
+
+        // Same ordering as the build (by id), so patched and fresh catalogs match
+        function applyPatch(discounts, patch) {{
+            const removed = new Set(patch.removes);
+            const byId = new Map(discounts.filter(d => !removed.has(d.id)).map(d => [d.id, d]));
+            patch.upserts.forEach(d => byId.set(d.id, d));
+            return Array.from(byId.values()).sort((a, b) => (a.id < b.id ? -1 : a.id > b.id ? 1 : 0));
+        }}
+
+        // --- LOCAL CATALOG STORE ---
+        // IndexedDB holds one record per discount, keyed by id, and the dataset
+        // version they belong to together with its indexes. The indexes are
+        // stamped with INDEX_FORMAT and rebuilt from the records when a page
+        // with another format reads them. localStorage is the fallback where
+        // IndexedDB is missing.
+        const CATALOG_DB_NAME = 'vaquero-catalog';
+        const INDEX_FORMAT = {INDEX_FORMAT};
+        // Version 2 dropped the category and role store indexes, which no query used
+        const CATALOG_DB_VERSION = 2;
+        const CATALOG_STORAGE_KEY = 'vaquero_catalog';
+        let catalogDB = null;
+
+        function openCatalogDB() {{
+            if (!catalogDB) {{
+                catalogDB = new Promise((resolve, reject) => {{
+                    if (!window.indexedDB) throw new Error('IndexedDB unavailable');
+                    const req = indexedDB.open(CATALOG_DB_NAME, CATALOG_DB_VERSION);
+                    req.onupgradeneeded = (event) => {{
+                        const db = req.result;
+                        if (event.oldVersion < 1) {{
+                            db.createObjectStore('discounts', {{ keyPath: 'id' }});
+                            db.createObjectStore('versions', {{ keyPath: 'version' }});
+                            return;
+                        }}
+                        // Keep the stored records; only the indexes kept up on every write go
+                        const discounts = req.transaction.objectStore('discounts');
+                        ['category', 'role'].forEach(name => {{
+                            if (discounts.indexNames.contains(name)) discounts.deleteIndex(name);
+                        }});
+                    }};
+                    req.onsuccess = () => resolve(req.result);
+                    req.onerror = () => reject(req.error);
+                }});
+            }}
+            return catalogDB;
+        }}
+
+        function idbRequest(req) {{
+            return new Promise((resolve, reject) => {{
+                req.onsuccess = () => resolve(req.result);
+                req.onerror = () => reject(req.error);
+            }});
+        }}
+
+        function idbTransaction(tx) {{
+            return new Promise((resolve, reject) => {{
+                tx.oncomplete = () => resolve();
+                tx.onerror = tx.onabort = () => reject(tx.error);
+            }});
+        }}
+
+        function readLocalCatalog() {{
+            return openCatalogDB()
+                .then(db => {{
+                    const tx = db.transaction(['discounts', 'versions'], 'readonly');
+                    return Promise.all([
+                        idbRequest(tx.objectStore('versions').getAll()),
+                        idbRequest(tx.objectStore('discounts').getAll())
+                    ]);
+                }})
+                .then(([versions, discounts]) => {{
+                    if (versions.length === 0) return null;
+                    // getAll() returns records in key order, i.e. by id like the build
+                    const record = versions[versions.length - 1];
+                    return {{ version: record.version, discounts, indexes: storedIndexes(record) }};
+                }})
+                .catch(() => {{
+                    try {{
+                        const catalog = JSON.parse(localStorage.getItem(CATALOG_STORAGE_KEY));
+                        return catalog && {{ ...catalog, indexes: storedIndexes(catalog) }};
+                    }} catch (e) {{
+                        return null;
+                    }}
+                }});
+        }}
+
+        // Stored indexes when they are in this page's format; null has them rebuilt from the records
+        function storedIndexes(record) {{
+            return record.indexFormat === INDEX_FORMAT && record.indexes ? record.indexes : null;
+        }}
+
+        function writeVersion(tx, catalog) {{
+            const versions = tx.objectStore('versions');
+            versions.clear();
+            versions.put({{ version: catalog.version, indexFormat: INDEX_FORMAT, indexes: catalog.indexes }});
+        }}
+
+        // Adds indexes built after loading to the stored version they were built for
+        function storeIndexes(version, indexes) {{
+            return openCatalogDB()
+                .then(db => {{
+                    const tx = db.transaction(['versions'], 'readwrite');
+                    const versions = tx.objectStore('versions');
+                    const req = versions.get(version);
+                    // A newer sync may have replaced the version in the meantime
+                    req.onsuccess = () => {{
+                        if (req.result) versions.put({{ ...req.result, indexFormat: INDEX_FORMAT, indexes }});
+                    }};
+                    return idbTransaction(tx);
+                }})
+                .catch(() => {{
+                    try {{
+                        const catalog = JSON.parse(localStorage.getItem(CATALOG_STORAGE_KEY));
+                        if (catalog && catalog.version === version) storeFallback({{ ...catalog, indexes }});
+                    }} catch (e) {{
+                        console.log('Could not persist catalog indexes', e);
+                    }}
+                }});
+        }}
+
+        function storeSnapshot(catalog) {{
+            return openCatalogDB()
+                .then(db => {{
+                    const tx = db.transaction(['discounts', 'versions'], 'readwrite');
+                    const store = tx.objectStore('discounts');
+                    store.clear();
+                    catalog.discounts.forEach(d => store.put(d));
+                    writeVersion(tx, catalog);
+                    return idbTransaction(tx);
+                }})
+                .catch(() => storeFallback(catalog));
+        }}
+
+        // Only the records a patch touches are written
+        function storePatches(catalog, patches) {{
+            return openCatalogDB()
+                .then(db => {{
+                    const tx = db.transaction(['discounts', 'versions'], 'readwrite');
+                    const store = tx.objectStore('discounts');
+                    patches.forEach(patch => {{
+                        patch.removes.forEach(id => store.delete(id));
+                        patch.upserts.forEach(d => store.put(d));
+                    }});
+                    writeVersion(tx, catalog);
+                    return idbTransaction(tx);
+                }})
+                .catch(() => storeFallback(catalog));
+        }}
+
+        function storeFallback(catalog) {{
+            const record = {{ version: catalog.version, discounts: catalog.discounts }};
+            try {{
+                localStorage.setItem(CATALOG_STORAGE_KEY,
+                    JSON.stringify({{ ...record, indexFormat: INDEX_FORMAT, indexes: catalog.indexes }}));
+            }} catch (e) {{
+                // Over quota with the indexes: keep the records, the indexes are rebuilt on load
+                try {{
+                    localStorage.setItem(CATALOG_STORAGE_KEY, JSON.stringify(record));
+                }} catch (e2) {{
+                    console.log('Could not persist catalog', e2);
+                }}
+            }}
         }}
 
         function registerSW() {{
@@ -945,14 +1886,14 @@ html_content = f"""<!DOCTYPE html>
             // Search
             els.search.addEventListener('input', (e) => {{
                 state.search = e.target.value;
-                saveState();
-                renderAll();
+                scheduleRender();
             }});
 
             // Categories
             els.categories.addEventListener('click', (e) => {{
-                if (e.target.classList.contains('chip')) {{
-                    const cat = e.target.dataset.cat;
+                const chip = e.target.closest('.chip');
+                if (chip) {{
+                    const cat = chip.dataset.cat;
                     if (state.category === cat) {{
                         state.category = null; // Toggle off
                     }} else {{
@@ -980,6 +1921,14 @@ html_content = f"""<!DOCTYPE html>
                 }}
             }});
 
+            // Near me
+            els.nearMe.addEventListener('click', toggleNearMe);
+            els.radius.addEventListener('change', () => {{
+                state.radiusMiles = els.radius.value ? Number(els.radius.value) : null;
+                saveState();
+                if (state.origin) renderAll();
+            }});
+
             // Clear
             els.clearBtn.addEventListener('click', clearAllFilters);
 
@@ -995,25 +1944,65 @@ html_content = f"""<!DOCTYPE html>
             state.search = "";
             state.category = null;
             state.eligibility.clear();
+            state.origin = null;
             els.search.value = "";
             renderCategoryChips();
             renderEligibilityToggles();
+            renderNearMe();
             saveState();
             renderAll();
         }}
 
+        // The visitor's position is asked for on each visit and never stored
+        function toggleNearMe() {{
+            if (state.origin) {{
+                state.origin = null;
+                renderNearMe();
+                renderAll();
+                return;
+            }}
+            if (!('geolocation' in navigator)) {{
+                alert("This browser cannot share your location.");
+                return;
+            }}
+            els.nearMe.disabled = true;
+            els.nearMe.textContent = 'Locating...';
+            navigator.geolocation.getCurrentPosition(position => {{
+                state.origin = {{ lat: position.coords.latitude, lng: position.coords.longitude }};
+                renderNearMe();
+                renderAll();
+            }}, () => {{
+                renderNearMe();
+                alert("Could not get your location. Please check the browser's location permission.");
+            }}, {{ timeout: 10000, maximumAge: 300000 }});
+        }}
+
         // --- RENDER FILTERS ---
         function renderFilters() {{
             renderCategoryChips();
             renderEligibilityToggles();
+            renderNearMe();
             els.search.value = state.search;
         }}
 
+        function renderNearMe() {{
+            els.nearMe.disabled = false;
+            els.nearMe.textContent = 'Near me';
+            els.nearMe.classList.toggle('active', Boolean(state.origin));
+            els.radius.value = state.radiusMiles ? String(state.radiusMiles) : '';
+            updateClearButton();
+        }}
+
+        // Chips are created once; later calls only move the active class
         function renderCategoryChips() {{
-            els.categories.innerHTML = CATEGORIES.map(cat => {{
-                const isActive = state.category === cat;
-                return `<button class="chip ${{isActive ? 'active' : ''}}" data-cat="${{cat}}">${{cat}}</button>`;
-            }}).join('');
+            if (!els.categories.children.length) {{
+                els.categories.innerHTML = CATEGORIES.map(cat =>
+                    `<button class="chip" data-cat="${{cat}}">${{cat}} <span class="facet-count"></span></button>`
+                ).join('');
+            }}
+            Array.from(els.categories.children).forEach(chip => {{
+                chip.classList.toggle('active', state.category === chip.dataset.cat);
+            }});
         }}
 
         function renderEligibilityToggles() {{
@@ -1025,53 +2014,264 @@ html_content = f"""<!DOCTYPE html>
                     btn.classList.remove('active');
                 }}
             }});
+            updateClearButton();
+        }}
+
+        // Counts beside each chip and toggle for the current search and "Near me".
+        // Only counters whose number changed are written.
+        function renderFacetCounts(counts) {{
+            Array.from(els.categories.children).forEach(chip => {{
+                setFacetCount(chip, counts.categories[chip.dataset.cat] || 0);
+            }});
+            Array.from(els.eligibility.children).forEach(btn => {{
+                setFacetCount(btn, counts.roles[btn.dataset.value] || 0);
+            }});
+        }}
 
-            const hasFilters = state.search || state.category || state.eligibility.size > 0;
+        function setFacetCount(button, count) {{
+            if (button.dataset.count === String(count)) return;
+            button.dataset.count = count;
+            button.querySelector('.facet-count').textContent = `(${{count}})`;
+            button.classList.toggle('empty', count === 0);
+        }}
+
+        function updateClearButton() {{
+            const hasFilters = state.search || state.category || state.eligibility.size > 0 || state.origin;
             els.clearBtn.style.display = hasFilters ? 'block' : 'none';
         }}
 
         // --- CORE LOGIC ---
-        function getFilteredDiscounts() {{
-            return DISCOUNTS.filter(d => {{
-                if (state.search) {{
-                    const q = state.search.toLowerCase();
-                    const text = (d.businessName + " " + d.description + " " + d.tags.join(" ")).toLowerCase();
-                    if (!text.includes(q)) return false;
-                }}
-                if (state.category && d.category !== state.category) {{
-                    return false;
-                }}
-                if (state.eligibility.size > 0) {{
-                    const selected = Array.from(state.eligibility);
-                    const hasIntersection = selected.some(role => d.whoCanRedeem.includes(role));
-                    if (!hasIntersection) return false;
+{SEARCH_ENGINE_JS}
+
+        // --- CATEGORY & ELIGIBILITY BITSETS ---
+        const ROLES = {json.dumps(list(ROLES))};
+{FILTER_ENGINE_JS}
+
+        // --- NEAR ME ---
+        const GEO_CELL_DEGREES = {GEO_CELL_DEGREES};
+{GEO_ENGINE_JS}
+
+        // --- QUERIES ---
+{QUERY_ENGINE_JS}
+        let catalogQuery = null;
+
+        // Catalog positions ordered by business name; from the worker, or the inline engine
+        let sortedPositions = [];
+
+        // The current filter state as a query; plain data, so it can be posted to the worker.
+        // sortBy is 'name', or 'distance' from the visitor (the default while "Near me" is on)
+        function currentQuery(sortBy = state.origin ? 'distance' : 'name') {{
+            return {{
+                search: state.search,
+                category: state.category,
+                roles: Array.from(state.eligibility),
+                origin: state.origin,
+                radiusMiles: state.radiusMiles,
+                sortBy
+            }};
+        }}
+
+        // The inline engine, built on first use: only when there is no worker, or it failed
+        function inlineQuery() {{
+            if (!catalogQuery) {{
+                if (!CATALOG_INDEXES.search) useIndexes(buildIndexes(DISCOUNTS, ROLES, GEO_CELL_DEGREES));
+                catalogQuery = createCatalogQuery(DISCOUNTS, CATALOG_INDEXES);
+                sortedPositions = catalogQuery.sortedPositions;
+            }}
+            return catalogQuery;
+        }}
+
+        function runQuery(query) {{
+            return inlineQuery().run(query);
+        }}
+
+        function getFilteredPositions(sortBy) {{
+            return runQuery(currentQuery(sortBy)).positions;
+        }}
+
+        function getFilteredDiscounts(options = {{}}) {{
+            return getFilteredPositions(options.sortBy).map(i => DISCOUNTS[i]);
+        }}
+
+        // --- RENDERING ---
+        // Typing only schedules a render; a burst of keystrokes costs one pass.
+        const RENDER_DELAY_MS = 120;
+        let renderTimer = null;
+
+        function scheduleRender() {{
+            clearTimeout(renderTimer);
+            renderTimer = setTimeout(() => {{
+                saveState();
+                renderAll();
+            }}, RENDER_DELAY_MS);
+        }}
+
+        // One card node per discount, created on first render and kept in sorted
+        // order. Filtering only flips `hidden` on cards whose visibility changed.
+        const cardNodes = [];
+        let visiblePositions = new Set();
+        let cardsReordered = false; // "Near me" moved cards out of name order
+        let featuredRendered = false;
+
+        function createCardNode(item) {{
+            const tpl = document.createElement('template');
+            tpl.innerHTML = renderCard(item).trim();
+            return tpl.content.firstElementChild;
+        }}
+
+        // byDistance: positions are not in name order, so the cards are reordered to match
+        function renderResults(positions, byDistance) {{
+            if (windowed) {{
+                windowPositions = positions;
+                renderWindow();
+                return;
+            }}
+
+            if (cardNodes.length === 0) {{
+                const frag = document.createDocumentFragment();
+                sortedPositions.forEach(i => {{
+                    const node = createCardNode(DISCOUNTS[i]);
+                    node.hidden = true;
+                    cardNodes[i] = node;
+                    frag.appendChild(node);
+                }});
+                els.resultsGrid.replaceChildren(frag);
+            }}
+
+            const next = new Set(positions);
+            visiblePositions.forEach(i => {{
+                if (!next.has(i)) cardNodes[i].hidden = true;
+            }});
+            next.forEach(i => {{
+                if (!visiblePositions.has(i)) cardNodes[i].hidden = false;
+            }});
+            visiblePositions = next;
+
+            if (byDistance) {{
+                els.resultsGrid.append(...positions.map(i => cardNodes[i]));
+                cardsReordered = true;
+            }} else if (cardsReordered) {{
+                els.resultsGrid.append(...sortedPositions.map(i => cardNodes[i]));
+                cardsReordered = false;
+            }}
+        }}
+
+        // --- WINDOWED GRID ---
+        // Large catalogs only render the rows near the viewport. Rows get a fixed
+        // height so the scroll height stays exact, padding stands in for the rows
+        // that are not rendered, and card nodes are recycled as the window moves.
+        const WINDOWED_THRESHOLD = 300;
+        const WINDOW_ROW_HEIGHT = 230;
+        const WINDOW_ROW_GAP = 24; // matches .grid gap
+        const WINDOW_OVERSCAN_ROWS = 3;
+        let windowed = false;
+        let windowPositions = [];
+        let windowFrame = null;
+        let windowListening = false;
+        const windowPool = [];
+
+        // Runs for every catalog; the previous catalog's window state never carries over
+        function setupWindowedGrid() {{
+            windowed = DISCOUNTS.length > WINDOWED_THRESHOLD || new URLSearchParams(location.search).has('windowed');
+            els.resultsGrid.style.gridAutoRows = windowed ? `${{WINDOW_ROW_HEIGHT}}px` : '';
+            els.resultsGrid.style.paddingTop = els.resultsGrid.style.paddingBottom = '';
+            windowPositions = [];
+            windowPool.length = 0;
+            if (windowFrame !== null) {{
+                cancelAnimationFrame(windowFrame);
+                windowFrame = null;
+            }}
+            // Registered once; they do nothing while the grid is not windowed
+            if (windowed && !windowListening) {{
+                window.addEventListener('scroll', scheduleWindow, {{ passive: true }});
+                window.addEventListener('resize', scheduleWindow);
+                windowListening = true;
+            }}
+        }}
+
+        function scheduleWindow() {{
+            if (windowed && windowFrame === null) windowFrame = requestAnimationFrame(renderWindow);
+        }}
+
+        function gridColumns() {{
+            return getComputedStyle(els.resultsGrid).gridTemplateColumns.split(' ').length || 1;
+        }}
+
+        function renderWindow() {{
+            windowFrame = null;
+            const grid = els.resultsGrid;
+            const cols = gridColumns();
+            const stride = WINDOW_ROW_HEIGHT + WINDOW_ROW_GAP;
+            const totalRows = Math.ceil(windowPositions.length / cols);
+            const gridTop = grid.getBoundingClientRect().top + window.scrollY;
+
+            const firstRow = Math.max(0, Math.floor((window.scrollY - gridTop) / stride) - WINDOW_OVERSCAN_ROWS);
+            const lastRow = Math.min(totalRows, Math.ceil((window.scrollY + window.innerHeight - gridTop) / stride) + WINDOW_OVERSCAN_ROWS);
+            const start = Math.min(firstRow * cols, windowPositions.length);
+            const end = Math.min(lastRow * cols, windowPositions.length);
+
+            // Park surplus nodes, then fill the window reusing what is already there
+            while (grid.children.length > Math.max(0, end - start)) {{
+                windowPool.push(grid.removeChild(grid.lastChild));
+            }}
+            for (let k = start; k < end; k++) {{
+                const item = DISCOUNTS[windowPositions[k]];
+                let node = grid.children[k - start];
+                if (!node) {{
+                    node = windowPool.pop() || createCardNode(item);
+                    grid.appendChild(node);
                 }}
-                return true;
-            }}).sort((a, b) => a.businessName.localeCompare(b.businessName));
+                if (node.dataset.id !== item.id) fillCard(node, item);
+            }}
+
+            grid.style.paddingTop = `${{firstRow * stride}}px`;
+            grid.style.paddingBottom = `${{Math.max(0, totalRows - lastRow) * stride}}px`;
+        }}
+
+        // Points a recycled card node (built by renderCard) at another discount
+        function fillCard(node, item) {{
+            const badge = node.querySelector('.discount-badge');
+            node.dataset.id = item.id;
+            node.querySelector('.category-badge').textContent = item.category;
+            badge.textContent = truncateText(item.discountAmount, 25);
+            badge.title = item.discountAmount;
+            node.querySelector('.card-title').textContent = item.businessName;
+            node.querySelector('.card-eligibility').textContent = `For: ${{item.whoCanRedeem.join(", ")}}`;
+            node.querySelector('.details-btn').setAttribute('onclick', `openModal('${{item.id}}')`);
         }}
 
         function renderAll() {{
-            const filtered = getFilteredDiscounts();
-            els.resultCount.textContent = `Showing ${{filtered.length}} discount${{filtered.length !== 1 ? 's' : ''}}`;
+            const query = currentQuery();
+            if (searchWorker) {{
+                searchWorker.postMessage({{ type: 'query', seq: ++querySeq, query }});
+            }} else {{
+                applyResults(runQuery(query));
+            }}
+        }}
+
+        function applyResults({{ positions, counts }}) {{
+            if (counts) renderFacetCounts(counts);
+            const within = state.origin && state.radiusMiles ? ` within ${{state.radiusMiles}} mi` : '';
+            els.resultCount.textContent = `Showing ${{positions.length}} discount${{positions.length !== 1 ? 's' : ''}}${{within}}`;
 
-            const featured = filtered.filter(d => d.isFeatured);
-            const isFiltering = state.search || state.category || state.eligibility.size > 0;
+            // Featured offers only show unfiltered, so they are rendered once
+            const isFiltering = state.search || state.category || state.eligibility.size > 0 || state.origin;
 
-            if (featured.length > 0 && !isFiltering) {{
+            if (!isFiltering && !featuredRendered) {{
+                const featured = sortedPositions.filter(i => DISCOUNTS[i].isFeatured).slice(0, 3);
+                els.featuredGrid.innerHTML = featured.map(i => renderCard(DISCOUNTS[i])).join('');
+                featuredRendered = true;
+            }}
+
+            if (!isFiltering && els.featuredGrid.innerHTML) {{
                 els.featuredSection.style.display = 'block';
-                els.featuredGrid.innerHTML = featured.slice(0, 3).map(renderCard).join('');
             }} else {{
                 els.featuredSection.style.display = 'none';
             }}
 
-            if (filtered.length === 0) {{
-                els.resultsGrid.innerHTML = '';
-                els.emptyState.style.display = 'block';
-            }} else {{
-                els.emptyState.style.display = 'none';
-                els.resultsGrid.innerHTML = filtered.map(renderCard).join('');
-            }}
-            renderEligibilityToggles();
+            els.emptyState.style.display = positions.length === 0 ? 'block' : 'none';
+            renderResults(positions, Boolean(state.origin));
+            updateClearButton();
         }}
 
         function truncateText(text, limit) {{
@@ -1085,7 +2285,7 @@ html_content = f"""<!DOCTYPE html>
             const discountDisplay = truncateText(item.discountAmount, 25);
 
             return `
-            <article class="card">
+            <article class="card" data-id="${{item.id}}">
                 <div class="card-header">
                     <div class="card-badge-row">
                         <span class="category-badge">${{item.category}}</span>
@@ -1105,8 +2305,21 @@ html_content = f"""<!DOCTYPE html>
         }}
 
         // --- MODAL & PDF ---
+        // --- LOOKUP ---
+        // byId maps each id to its catalog position, built and checked unique at build time
+        function getDiscount(id) {{
+            const position = CATALOG_INDEXES.byId[String(id)];
+            return position === undefined ? null : DISCOUNTS[position];
+        }}
+
+        function getDiscounts(ids) {{
+            return ids.map(getDiscount).filter(Boolean);
+        }}
+
+        window.getDiscounts = getDiscounts;
+
         window.openModal = function(id) {{
-            const item = DISCOUNTS.find(d => d.id == id);
+            const item = getDiscount(id);
             if (!item) return;
             state.currentModalItem = item;
 
@@ -1191,16 +2404,58 @@ html_content = f"""<!DOCTYPE html>
 
         window.saveCurrentAsPDF = function() {{
             if (!state.currentModalItem) return;
-            const item = state.currentModalItem;
+            saveDiscountsAsPDF([state.currentModalItem.id]);
+        }};
 
-            if (!window.jspdf) {{
-                alert("PDF library not loaded. Please check internet connection.");
-                return;
+        // jsPDF is only needed for exports, so it is fetched on the first one
+        const JSPDF_URL = '{assets['jspdfUrl']}';
+        let pdfLibrary = null;
+
+        function loadPdfLibrary() {{
+            if (window.jspdf) return Promise.resolve(window.jspdf);
+            if (!pdfLibrary) {{
+                pdfLibrary = new Promise((resolve, reject) => {{
+                    const script = document.createElement('script');
+                    script.src = JSPDF_URL;
+                    script.async = true;
+                    script.onload = () => resolve(window.jspdf);
+                    script.onerror = () => {{
+                        script.remove();
+                        pdfLibrary = null;
+                        reject(new Error('Failed to load ' + JSPDF_URL));
+                    }};
+                    document.head.appendChild(script);
+                }});
             }}
+            return pdfLibrary;
+        }}
 
-            const {{ jsPDF }} = window.jspdf;
+        // Exports one coupon page per discount into a single PDF
+        window.saveDiscountsAsPDF = function(ids) {{
+            const items = getDiscounts(ids);
+            if (items.length === 0) return Promise.resolve();
+
+            return loadPdfLibrary().then(
+                (jspdf) => writeCouponsPDF(jspdf, items),
+                () => alert("PDF library not loaded. Please check internet connection.")
+            );
+        }};
+
+        function writeCouponsPDF(jspdf, items) {{
+            const {{ jsPDF }} = jspdf;
             const doc = new jsPDF();
+            items.forEach((item, n) => {{
+                if (n > 0) doc.addPage();
+                drawCoupon(doc, item);
+            }});
 
+            const fileName = items.length === 1
+                ? `${{items[0].businessName.replace(/[^a-z0-9]/gi, '_').toLowerCase()}}_coupon.pdf`
+                : 'vaquero_discounts_coupons.pdf';
+            doc.save(fileName);
+        }}
+
+        function drawCoupon(doc, item) {{
             // Layout constants
             const margin = 20;
             const pageWidth = doc.internal.pageSize.getWidth();
@@ -1331,9 +2586,7 @@ html_content = f"""<!DOCTYPE html>
 
             doc.setTextColor(240, 80, 35);
             doc.textWithLink("utrgv.edu/vdp", margin, footerY, {{ url: "https://www.utrgv.edu/vdp" }});
-
-            doc.save(`${{item.businessName.replace(/[^a-z0-9]/gi, '_').toLowerCase()}}_coupon.pdf`);
-        }};
+        }}
 
         window.clearAllFilters = clearAllFilters;
 
@@ -1342,7 +2595,8 @@ html_content = f"""<!DOCTYPE html>
             const s = {{
                 search: state.search,
                 category: state.category,
-                eligibility: Array.from(state.eligibility)
+                eligibility: Array.from(state.eligibility),
+                radiusMiles: state.radiusMiles
             }};
             localStorage.setItem('vaquero_state', JSON.stringify(s));
         }}
@@ -1354,6 +2608,7 @@ html_content = f"""<!DOCTYPE html>
                     if (s.search) state.search = s.search;
                     if (s.category) state.category = s.category;
                     if (s.eligibility) state.eligibility = new Set(s.eligibility);
+                    if (s.radiusMiles !== undefined) state.radiusMiles = s.radiusMiles;
                 }}
             }} catch (e) {{
                 console.log("No saved state");
@@ -1367,17 +2622,391 @@ html_content = f"""<!DOCTYPE html>
 </html>
 """
 
-# Write HTML
-with open(OUTPUT_HTML, "w", encoding='utf-8') as f:
-    f.write(html_content)
-print(f"File {OUTPUT_HTML} created successfully.")
+# --- INCREMENTAL BUILD ---
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
 
-# Write Manifest
-with open(OUTPUT_MANIFEST, "w", encoding='utf-8') as f:
-    f.write(manifest_content)
-print(f"File {OUTPUT_MANIFEST} created successfully.")
+def file_hash(path):
+    try:
+        with open(path, 'rb') as f:
+            return content_hash(f.read())
+    except FileNotFoundError:
+        return None
+
+def local_imports(path):
+    """Repo modules imported by the Python file at path (stdlib and third-party ones are skipped)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    base = os.path.dirname(path)
+    return {os.path.join(base, f"{name}.py") for name in names if os.path.exists(os.path.join(base, f"{name}.py"))}
+
+def source_hash():
+    """Hash of this file and every repo module it imports, directly or not: all of them shape the output."""
+    pending, seen = [os.path.abspath(__file__)], set()
+    while pending:
+        path = pending.pop()
+        if path not in seen:
+            seen.add(path)
+            pending.extend(local_imports(path))
+    return content_hash(json.dumps({os.path.basename(path): file_hash(path) for path in sorted(seen)}).encode('utf-8'))
+
+def load_build_manifest():
+    try:
+        with open(BUILD_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"inputs": {}, "outputs": {}}
+
+def save_build_manifest(manifest):
+    with open(BUILD_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def outputs_intact(manifest):
+    """True when every recorded output is still on disk exactly as the last build wrote it."""
+    outputs = manifest.get("outputs", {})
+    return bool(outputs) and all(file_hash(path) == digest for path, digest in outputs.items())
+
+def render_worker():
+    """search-worker.js: the page's query engines plus the worker's message loop."""
+    engines = [SEARCH_ENGINE_JS, FILTER_ENGINE_JS, GEO_ENGINE_JS, QUERY_ENGINE_JS]
+    return ("// Generated by build_html.py; answers the page's queries off the main thread\n"
+            + "\n".join(textwrap.dedent(js).strip() + "\n" for js in engines + [WORKER_JS]))
+
+def write_output(path, content):
+    """Writes content to path unless the file already holds it. Returns (hash, touched)."""
+    digest = content_hash(content)
+    if file_hash(path) == digest:
+        return digest, False
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if isinstance(content, bytes):
+        with open(path, "wb") as f:
+            f.write(content)
+    else:
+        with open(path, "w", encoding='utf-8') as f:
+            f.write(content)
+    return digest, True
+
+def build_indexes(discounts):
+    """Lookup structures shipped alongside the catalog; positions refer to discounts order."""
+    return {
+        "byId": build_id_index(discounts),
+        "search": build_search_index(discounts),
+        "geo": build_geo_index(discounts),
+        "filters": build_filter_index(discounts)
+    }
 
-# Write SW
-with open(OUTPUT_SW, "w", encoding='utf-8') as f:
-    f.write(sw_content)
-print(f"File {OUTPUT_SW} created successfully.")
+def inline_data_js(discounts, minify=False):
+    indexes = json.dumps(build_indexes(discounts), separators=(',', ':'))
+    catalog = json.dumps(discounts, separators=(',', ':')) if minify else json.dumps(discounts, indent=2)
+    return (f"const DISCOUNTS = {catalog};\n"
+            f"        const CATALOG_INDEXES = {indexes};\n"
+            f"        const DATA_POINTER_URL = null;")
+
+def asset_urls(assets):
+    """Same-origin files the page references besides the shell: vendored files and images."""
+    return sorted({f'./{path}' for path in assets["files"]} | set(assets["images"]["precache"]))
+
+def precache_asset_urls(assets):
+    """asset_urls without jsPDF, which the service worker caches on the first PDF export instead."""
+    return [url for url in asset_urls(assets) if url != f'./{assets["jspdfUrl"]}']
+
+def finish_outputs(outputs, precache, minify):
+    """Minifies the outputs if asked, then adds the service worker that precaches them."""
+    icon_urls = [f"./{icon['src']}" for icon in json.loads(outputs[OUTPUT_MANIFEST])["icons"]]
+    missing = find_missing_assets(precache + icon_urls, outputs)
+    if missing:
+        # A missing file would make the service worker install fail
+        raise ValueError(f"referenced assets not found: {', '.join(missing)}")
+    if minify:
+        before = sum(len(content) for content in outputs.values())
+        # Vendored files under assets/ ship already minified
+        outputs = {path: content if path.startswith(ASSET_DIR + "/") else minify_output(path, content)
+                   for path, content in outputs.items()}
+        after = sum(len(content) for content in outputs.values())
+        print(f"Minified outputs: {before} -> {after} characters.")
+    sw = render_sw(precache_entries(precache, outputs))
+    outputs[OUTPUT_SW] = minify_js(sw) if minify else sw
+    return outputs
+
+def build_inline(discounts, assets=CDN_ASSETS, minify=False):
+    """Outputs for the default build, with the catalog inlined into the page."""
+    outputs = {
+        OUTPUT_HTML: render_html(inline_data_js(discounts, minify), assets),
+        OUTPUT_MANIFEST: render_manifest(assets["images"]["icons"]),
+        OUTPUT_WORKER: render_worker(),
+        **assets["files"]
+    }
+    return finish_outputs(outputs, SW_ASSETS + precache_asset_urls(assets), minify)
+
+def diff_catalogs(old, new):
+    """Upserted items and removed ids that turn catalog old into new."""
+    old_by_id = {item["id"]: item for item in old}
+    new_ids = {item["id"] for item in new}
+    return {
+        "upserts": [item for item in new if old_by_id.get(item["id"]) != item],
+        "removes": [item_id for item_id in old_by_id if item_id not in new_ids]
+    }
+
+def advance_feed(previous_feed, data_hash):
+    """Feed state for this build; the version only moves when the catalog content does."""
+    if not previous_feed:
+        return {"version": 1, "hash": data_hash, "patchFloor": 1}
+    if previous_feed["hash"] == data_hash:
+        return dict(previous_feed)
+    version = previous_feed["version"] + 1
+    return {
+        "version": version,
+        "hash": data_hash,
+        "patchFloor": max(previous_feed["patchFloor"], version - FEED_PATCH_HISTORY)
+    }
+
+def build_split(discounts, previous_feed=None, previous_discounts=None, assets=CDN_ASSETS, minify=False):
+    """Outputs for a split build: a stable HTML shell plus content-hashed data and feed files."""
+    payload = json.dumps({"discounts": discounts, "indexes": build_indexes(discounts)},
+                         separators=(',', ':'), ensure_ascii=False)
+    data_file = f"{DATA_FILE_PREFIX}{content_hash(payload)[:12]}.json"
+    data_hash = catalog_hash(discounts)
+    feed = advance_feed(previous_feed, data_hash)
+
+    outputs = {}
+    if previous_feed and feed["version"] != previous_feed["version"]:
+        if previous_discounts is None:
+            # Nothing to diff against, so older clients have to take the snapshot
+            feed["patchFloor"] = feed["version"]
+        else:
+            patch = {"from": previous_feed["version"], "to": feed["version"],
+                     **diff_catalogs(previous_discounts, discounts)}
+            outputs[f"{FEED_PATCH_PREFIX}{feed['version']}.json"] = json.dumps(
+                patch, separators=(',', ':'), ensure_ascii=False)
+
+    pointer = {
+        "version": feed["version"],
+        "hash": data_hash,
+        "url": data_file,
+        "count": len(discounts),
+        "patchFloor": feed["patchFloor"],
+        "patchUrl": FEED_PATCH_PREFIX + "{version}.json"
+    }
+    data_js = (f"const DISCOUNTS = [];\n"
+               f"        const CATALOG_INDEXES = {{}};\n"
+               f"        const DATA_POINTER_URL = '{DATA_POINTER}';")
+
+    outputs.update({
+        OUTPUT_HTML: render_html(data_js, assets),
+        OUTPUT_MANIFEST: render_manifest(assets["images"]["icons"]),
+        OUTPUT_WORKER: render_worker(),
+        DATA_POINTER: json.dumps(pointer, indent=2),
+        data_file: payload,
+        **assets["files"]
+    })
+    precache = SW_ASSETS + precache_asset_urls(assets) + [f'./{DATA_POINTER}', f'./{data_file}']
+    return finish_outputs(outputs, precache, minify), feed
+
+def strip_variant(path):
+    """The file a precompressed sibling was made from (path itself for other files)."""
+    for suffix in COMPRESSED_SUFFIXES:
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+def prune_feed_patches(feed):
+    """Removes patches no client at or above the patch floor still needs."""
+    for name in os.listdir('.'):
+        if name.startswith(FEED_PATCH_PREFIX) and strip_variant(name).endswith(".json"):
+            version = strip_variant(name)[len(FEED_PATCH_PREFIX):-len(".json")]
+            if version.isdigit() and int(version) <= feed["patchFloor"]:
+                os.remove(name)
+                print(f"Removed expired patch {name}.")
+
+def prune_data_files(keep):
+    """Removes content-hashed data files other than those in keep."""
+    for name in os.listdir('.'):
+        if name.startswith(DATA_FILE_PREFIX) and strip_variant(name).endswith(".json") and name not in keep:
+            os.remove(name)
+            print(f"Removed stale data file {name}.")
+
+def add_compressed_variants(outputs, assets):
+    """Adds .gz (and .br, with brotli installed) siblings for every text output and static asset."""
+    if brotli is None:
+        print("Warning: brotli not installed; writing .gz variants only.")
+    sources = {path: content for path, content in outputs.items() if is_compressible(path)}
+    for url in asset_urls(assets):
+        path = url[2:]
+        if path not in sources and is_compressible(path) and os.path.exists(path):
+            with open(path, 'rb') as f:
+                sources[path] = f.read()
+    for path, content in sources.items():
+        for suffix, blob in compress_variants(content).items():
+            outputs[path + suffix] = blob
+    return sources
+
+def report_sizes(sources, outputs):
+    """Per-file transfer sizes for the original and each precompressed variant."""
+    print(f"{'file':<44}{'bytes':>10}{'gzip':>10}{'brotli':>10}")
+    totals = [0, 0, 0]
+    for path in sorted(sources):
+        content = sources[path]
+        size = len(content.encode('utf-8') if isinstance(content, str) else content)
+        # The host falls back to the original when a variant was not worth writing
+        sizes = [size] + [len(outputs.get(path + suffix, b"")) or size for suffix in COMPRESSED_SUFFIXES]
+        totals = [total + n for total, n in zip(totals, sizes)]
+        print(f"{path:<44}{sizes[0]:>10}{sizes[1]:>10}{sizes[2] if brotli else '-':>10}")
+    print(f"{'total':<44}{totals[0]:>10}{totals[1]:>10}{totals[2] if brotli else '-':>10}")
+
+def prune_compressed_variants(previous_outputs, outputs):
+    """Removes .gz/.br siblings written by the previous build that this one did not produce."""
+    for path in previous_outputs:
+        if not path.endswith(COMPRESSED_SUFFIXES) or path in outputs or not os.path.exists(path):
+            continue
+        # Variants of a previous data file or feed patch stay valid for as long
+        # as the file itself is kept
+        source = strip_variant(path)
+        if not (source.startswith((DATA_FILE_PREFIX, FEED_PATCH_PREFIX)) and os.path.exists(source)):
+            os.remove(path)
+            print(f"Removed stale variant {path}.")
+
+def prune_asset_files(keep):
+    """Removes vendored files from earlier builds that the current page no longer references."""
+    if not os.path.isdir(ASSET_DIR):
+        return
+    for name in os.listdir(ASSET_DIR):
+        path = f"{ASSET_DIR}/{name}"
+        if path not in keep:
+            os.remove(path)
+            print(f"Removed stale asset {path}.")
+
+def load_page_assets(discounts, images):
+    """Vendors the font and jsPDF; falls back to the CDN copies when they cannot be fetched."""
+    # The inlined page holds every UI string and catalog value, so its
+    # characters are the ones the font subset has to cover
+    text = render_html(inline_data_js(discounts), with_images(CDN_ASSETS, images))
+    try:
+        vendored = vendor_assets(text)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not vendor page assets ({e}); keeping the CDN font and jsPDF.")
+        return CDN_ASSETS, None
+    return self_hosted_assets(vendored), vendored
+
+def report_critical_path(outputs, vendored):
+    """Bytes fetched before first render, with the CDN assets and with the vendored ones."""
+    html_bytes = len(outputs[OUTPUT_HTML].encode('utf-8'))
+    upstream = vendored["upstreamBytes"]
+    preload_bytes = len(vendored["files"][vendored["preload"]]) if vendored["preload"] else 0
+    # The CDN page blocks on the font stylesheet and the jsPDF script; the
+    # fonts it names download in parallel before text paints
+    cdn_html_bytes = html_bytes - len(self_hosted_assets(vendored)["head"]) + len(CDN_ASSETS["head"])
+    before = cdn_html_bytes + upstream["fontCss"] + upstream["fonts"] + upstream["jspdf"]
+    after = html_bytes + preload_bytes
+    print(f"Critical path: {before} bytes before (HTML {cdn_html_bytes}, font CSS {upstream['fontCss']}, "
+          f"fonts {upstream['fonts']}, jsPDF {upstream['jspdf']}; 3 third-party hosts), "
+          f"{after} bytes after (HTML {html_bytes}, preloaded font {preload_bytes}; same origin).")
+
+def report_split_savings(discounts, outputs, assets):
+    """Compares what a client downloads for a data update against the inlined page."""
+    # Compressed variants are covered by report_sizes(); only the plain files are measured here
+    plain = [path for path in outputs if strip_variant(path) == path]
+    data_file = next(path for path in plain if path.startswith(DATA_FILE_PREFIX))
+    split_bytes = len(outputs[data_file].encode('utf-8')) + len(outputs[DATA_POINTER].encode('utf-8'))
+    inline_bytes = len(render_html(inline_data_js(discounts), assets).encode('utf-8'))
+    print(f"Data update cost: {split_bytes} bytes ({data_file} + {DATA_POINTER}) "
+          f"vs {inline_bytes} bytes for the inlined page; saves {inline_bytes - split_bytes} bytes per update.")
+
+    patches = [path for path in plain if path.startswith(FEED_PATCH_PREFIX)]
+    for patch in patches:
+        patch_bytes = len(outputs[patch].encode('utf-8')) + len(outputs[DATA_POINTER].encode('utf-8'))
+        print(f"Installed clients on the previous version download {patch_bytes} bytes ({patch} + {DATA_POINTER}).")
+
+def main(force=False, split_data=False, self_host_assets=False, minify=False, compress=False):
+    """Returns the outputs written (empty when all were current), or None when the build failed."""
+    # The template lives in this file and renders through the modules it
+    # imports, so their combined hash stands in for the template's
+    inputs = {
+        CSV_FILE: file_hash(CSV_FILE),
+        "template": source_hash(),
+        ICON_SOURCE: file_hash(ICON_SOURCE),
+        LOGO_SOURCE: file_hash(LOGO_SOURCE),
+        "mode": "split" if split_data else "inline",
+        "assets": "self-hosted" if self_host_assets else "cdn",
+        "minify": minify,
+        "compress": compress
+    }
+    if inputs[CSV_FILE] is None:
+        print(f"Error: {CSV_FILE} not found. Please run fetch_and_process.py first. Nothing was written.")
+        return None
+    previous = load_build_manifest()
+    if not force and previous.get("inputs") == inputs and outputs_intact(previous):
+        print("Inputs unchanged since last build; nothing to do.")
+        return []
+
+    # Ordered by id so the delta path, a full parse and a reordered sheet all
+    # produce byte-identical outputs
+    discounts = sorted(load_discounts(previous, inputs[CSV_FILE]), key=lambda d: d.id)
+    rows = [to_csv_row(d) for d in discounts]
+    discounts_data = [to_json(d) for d in discounts]
+    duplicates = find_duplicate_ids(discounts_data)
+    if duplicates:
+        print(f"Error: duplicate discount ids in {CSV_FILE}: {', '.join(duplicates)}. Nothing was written.")
+        return None
+
+    try:
+        images = build_images()
+        assets, vendored = load_page_assets(discounts_data, images) if self_host_assets else (CDN_ASSETS, None)
+        assets = with_images(assets, images)
+        feed = previous.get("feed")
+        if split_data:
+            # Without the published catalog the patch floor is raised, so clients refetch the snapshot
+            outputs, feed = build_split(discounts_data, feed, load_feed_catalog(feed), assets, minify)
+        else:
+            outputs = build_inline(discounts_data, assets, minify)
+    except ValueError as e:
+        print(f"Error: {e}. Nothing was written.")
+        return None
+    sources = add_compressed_variants(outputs, assets) if compress else None
+
+    rows_cache, _ = write_output(BUILD_ROWS_CACHE, json.dumps(rows, separators=(',', ':'), ensure_ascii=False))
+    if split_data:
+        write_output(FEED_CATALOG_CACHE, json.dumps(discounts_data, separators=(',', ':'), ensure_ascii=False))
+    manifest = {"inputs": inputs, "outputs": {}, "rowsCache": rows_cache, "feed": feed}
+    touched = []
+    for path, content in outputs.items():
+        digest, changed = write_output(path, content)
+        manifest["outputs"][path] = digest
+        if changed:
+            touched.append(path)
+            print(f"File {path} created successfully.")
+        else:
+            print(f"File {path} unchanged, skipped.")
+    save_build_manifest(manifest)
+
+    # Keep the previous payload around for clients still holding the old pointer
+    previous_data = [path for path in previous.get("outputs", {}) if path.startswith(DATA_FILE_PREFIX)]
+    prune_data_files(set(outputs) | set(previous_data))
+    prune_asset_files(set(outputs))
+    prune_compressed_variants(previous.get("outputs", {}), outputs)
+    if sources:
+        report_sizes(sources, outputs)
+    if vendored:
+        report_critical_path(outputs, vendored)
+    if split_data:
+        prune_feed_patches(feed)
+        report_split_savings(discounts_data, outputs, assets)
+
+    print(f"Build complete: {len(touched)} of {len(outputs)} outputs updated.")
+    return touched
+
+if __name__ == "__main__":
+    touched = main(force="--force" in sys.argv, split_data="--split-data" in sys.argv,
+                   self_host_assets="--self-host-assets" in sys.argv,
+                   minify="--minify" in sys.argv, compress="--compress" in sys.argv)
+    # A failed build must not pass for an up-to-date one in CI or cron
+    if touched is None:
+        sys.exit(1)
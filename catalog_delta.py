@@ -0,0 +1,159 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+# Written by fetch_and_process next to the snapshot it describes
+DELTA_SUFFIX = ".delta.json"
+# Append-only audit trail in the snapshot's directory: one line per run that changed something
+CHANGE_LOG = "sheet_changes.jsonl"
+
+def delta_path(csv_path):
+    """categorized_discounts.csv -> categorized_discounts.delta.json"""
+    return os.path.splitext(csv_path)[0] + DELTA_SUFFIX
+
+def change_log_path(csv_path):
+    return os.path.join(os.path.dirname(csv_path), CHANGE_LOG)
+
+def snapshot_hash(path):
+    """SHA-256 of a snapshot file, or None when it does not exist."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+def row_digest(row):
+    """Fingerprint of a processed row; two rows with the same digest are identical."""
+    return hashlib.sha1(json.dumps(row, sort_keys=True, ensure_ascii=False).encode('utf-8')).digest()
+
+def load_row_digests(path):
+    """
+    Reads a processed CSV into {id: row digest}; empty when there is no
+    previous run. Only digests are kept, so memory stays small however large
+    the catalog; changed rows are read back from the CSV by diff_rows().
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return {row["id"]: row_digest(row) for row in csv.DictReader(f)}
+    except FileNotFoundError:
+        return {}
+
+def new_delta(base_hash):
+    """
+    An in-progress delta. Added rows and modifications are spooled to
+    temporary files as JSON lines, so a first run, where every row is added,
+    does not hold the catalog in memory; the counts are kept alongside.
+    """
+    return {
+        "base": base_hash, "target": None, "removed": [],
+        "added": tempfile.TemporaryFile('w+', encoding='utf-8'), "addedCount": 0,
+        "modified": tempfile.TemporaryFile('w+', encoding='utf-8'), "modifiedCount": 0
+    }
+
+def diff_rows(rows, previous, delta, previous_path):
+    """
+    Passes rows through unchanged while recording how they differ from
+    previous ({id: digest} of previous_path). previous_path must still hold the
+    previous rows when the last row has been passed on.
+    """
+    seen = set()
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as changed:
+        changed_ids = set()
+        for row in rows:
+            seen.add(row["id"])
+            digest = previous.get(row["id"])
+            if digest is None:
+                delta["added"].write(json.dumps(row, ensure_ascii=False) + "\n")
+                delta["addedCount"] += 1
+            elif digest != row_digest(row):
+                changed.write(json.dumps(row, ensure_ascii=False) + "\n")
+                changed_ids.add(row["id"])
+            yield row
+        delta["removed"] = [row_id for row_id in previous if row_id not in seen]
+        if changed_ids:
+            record_modified(changed, changed_ids, previous_path, delta)
+
+def record_modified(changed, changed_ids, previous_path, delta):
+    """Spools field-level changes for the changed rows, reading their old values back from previous_path."""
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as old_rows:
+        # Old rows are copied aside with their offsets, so the two sides are
+        # joined by id without holding either in memory
+        offsets = {}
+        with open(previous_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                if row["id"] in changed_ids:
+                    offsets[row["id"]] = old_rows.tell()
+                    old_rows.write(json.dumps(row, ensure_ascii=False) + "\n")
+        changed.seek(0)
+        for line in changed:
+            row = json.loads(line)
+            old_rows.seek(offsets[row["id"]])
+            old = json.loads(old_rows.readline())
+            changes = {
+                field: {"old": old.get(field), "new": value}
+                for field, value in row.items() if old.get(field) != value
+            }
+            delta["modified"].write(json.dumps({"id": row["id"], "changes": changes}, ensure_ascii=False) + "\n")
+            delta["modifiedCount"] += 1
+
+def is_empty(delta):
+    return not (delta["addedCount"] or delta["removed"] or delta["modifiedCount"])
+
+def dump_delta(delta, out, newline):
+    """Writes delta as JSON, copying the spooled entries through; newline separates the entries."""
+    header = {key: delta[key] for key in ("base", "target", "generatedAt")}
+    out.write("{" + json.dumps(header, ensure_ascii=False)[1:-1])
+    for key in ("added", "removed", "modified"):
+        out.write(f',{newline}"{key}": [')
+        if key == "removed":
+            entries = (json.dumps(row_id, ensure_ascii=False) for row_id in delta[key])
+        else:
+            delta[key].seek(0)
+            entries = (line.rstrip("\n") for line in delta[key])
+        for i, entry in enumerate(entries):
+            out.write(("," if i else "") + newline + entry)
+        out.write("]")
+    out.write(newline + "}")
+
+def write_delta(delta, target_hash, csv_path):
+    """Writes the delta file next to csv_path and appends non-empty deltas to the change log."""
+    delta["target"] = target_hash
+    delta["generatedAt"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    with open(delta_path(csv_path), 'w', encoding='utf-8') as f:
+        dump_delta(delta, f, "\n")
+    if not is_empty(delta):
+        with open(change_log_path(csv_path), 'a', encoding='utf-8') as f:
+            dump_delta(delta, f, "")
+            f.write("\n")
+    delta["added"].close()
+    delta["modified"].close()
+
+def load_delta(csv_path):
+    """The delta last written next to csv_path, or None."""
+    path = delta_path(csv_path)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def apply_delta(rows, delta):
+    """Returns previous snapshot rows patched with delta; added rows go last."""
+    removed = set(delta["removed"])
+    modified = {change["id"]: change["changes"] for change in delta["modified"]}
+
+    patched = []
+    for row in rows:
+        if row["id"] in removed:
+            continue
+        if row["id"] in modified:
+            row = {**row, **{field: values["new"] for field, values in modified[row["id"]].items()}}
+        patched.append(row)
+    patched.extend(delta["added"])
+    return patched
@@ -0,0 +1,113 @@
+import base64
+import math
+import re
+import struct
+import unicodedata
+
+from discount_model import ROLES
+
+# Fields the search box matches against (same ones the page used to scan)
+SEARCH_FIELDS = ["businessName", "description", "tags"]
+
+# Combining marks stripped after NFKD, so "Café Señor" indexes as "cafe senor".
+# Kept to the same range the page strips, so build and client agree on tokens.
+COMBINING_MARKS = re.compile("[\u0300-\u036f]")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Side of a geo index cell in degrees (about 3.5 miles north-south)
+GEO_CELL_DEGREES = 0.05
+
+# Bump whenever the shape of any index below (or its page-side twin) changes;
+# installed pages rebuild stored indexes of another format instead of reading them
+INDEX_FORMAT = 1
+
+def normalize_text(text):
+    """Lowercases text and folds accents."""
+    return COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", text or "")).lower()
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(normalize_text(text))
+
+def search_text(item):
+    parts = []
+    for field in SEARCH_FIELDS:
+        value = item.get(field, "")
+        parts.append(" ".join(value) if isinstance(value, list) else value)
+    return " ".join(parts)
+
+def build_search_index(discounts):
+    """Builds the inverted index the page searches instead of scanning every discount.
+
+    tokens is sorted, so every token sharing a prefix sits in one contiguous run
+    the client finds by binary search; postings[i] lists the positions (in
+    discounts order) of the discounts containing tokens[i].
+    """
+    postings = {}
+    for position, item in enumerate(discounts):
+        for token in set(tokenize(search_text(item))):
+            postings.setdefault(token, []).append(position)
+    tokens = sorted(postings)
+    return {"tokens": tokens, "postings": [postings[token] for token in tokens]}
+
+def find_duplicate_ids(discounts):
+    """Returns ids used by more than one discount, in first-seen order."""
+    seen = set()
+    duplicates = []
+    for item in discounts:
+        if item["id"] in seen and item["id"] not in duplicates:
+            duplicates.append(item["id"])
+        seen.add(item["id"])
+    return duplicates
+
+def build_id_index(discounts):
+    """Maps each discount id to its position, for constant-time lookups on the page."""
+    return {item["id"]: position for position, item in enumerate(discounts)}
+
+def geo_cell_key(lat, lng, cell=GEO_CELL_DEGREES):
+    return f"{math.floor(lat / cell)}:{math.floor(lng / cell)}"
+
+def build_geo_index(discounts, cell=GEO_CELL_DEGREES):
+    """Buckets discount positions into a lat/lng grid for "near me" queries.
+
+    cells maps "row:col" to the positions inside that cell, so a radius or
+    nearest-N query only visits the cells around the visitor. Discounts
+    without coordinates are left out.
+    """
+    cells = {}
+    for position, item in enumerate(discounts):
+        if item.get("lat") is None or item.get("lng") is None:
+            continue
+        cells.setdefault(geo_cell_key(item["lat"], item["lng"], cell), []).append(position)
+    return {"cell": cell, "cells": cells}
+
+def encode_typed_array(data):
+    """Bytes of a typed array as base64 text, the form the page decodes."""
+    return base64.b64encode(data).decode('ascii')
+
+def encode_bitset(words):
+    return encode_typed_array(struct.pack(f"<{len(words)}I", *words))
+
+def build_filter_index(discounts):
+    """Category and eligibility filters as bitsets the page combines with bitwise AND.
+
+    byRole[i] and byCategory[c] have bit p set when the discount at position p
+    is redeemable by ROLES[i] or filed under categories[c]. Bitsets are shipped
+    base64-encoded as little-endian uint32 words.
+    """
+    categories = sorted({item["category"] for item in discounts})
+    codes = {category: code for code, category in enumerate(categories)}
+    words = (len(discounts) + 31) // 32
+    by_role = [[0] * words for _ in ROLES]
+    by_category = [[0] * words for _ in categories]
+    for position, item in enumerate(discounts):
+        word, bit = position >> 5, 1 << (position & 31)
+        by_category[codes[item["category"]]][word] |= bit
+        for i, role in enumerate(ROLES):
+            if role in item["whoCanRedeem"]:
+                by_role[i][word] |= bit
+    return {
+        "roles": list(ROLES),
+        "categories": categories,
+        "byRole": [encode_bitset(bits) for bits in by_role],
+        "byCategory": [encode_bitset(bits) for bits in by_category]
+    }
@@ -0,0 +1,238 @@
+import gc
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from itertools import accumulate
+
+from discount_model import DISCOUNT_FIELDS, ROLES, Discount, roles_tuple
+
+# Binary columnar copy of the processed catalog, written by fetch_and_process
+# next to the CSV so the build can load it without parsing CSV:
+#
+#   magic, u32 header length, JSON header, then one section per column.
+#
+# The header lists each column's encoding, offset and size, the
+# dictionaries of dictionary-encoded columns and the SHA-256 of the CSV it
+# was written with. All numbers are little-endian.
+SNAPSHOT_SUFFIX = ".snapshot"
+SNAPSHOT_MAGIC = b"VDPSNAP\x01"
+SNAPSHOT_VERSION = 1
+
+# How each Discount field is stored:
+#   str   u32 byte length per row, then the UTF-8 bytes of every row
+#   dict  u16 (or u32) code per row into a dictionary kept in the header
+#   tags  like dict, for tuples of tags
+#   roles one bitmask byte per row, bit i for ROLES[i]
+#   bool  one byte per row
+#   f64   one double per row, NaN for None
+SNAPSHOT_COLUMNS = {
+    "id": "str", "businessName": "str", "category": "dict", "discountAmount": "str",
+    "whoCanRedeem": "roles", "howToRedeem": "dict", "description": "str", "address": "str",
+    "phone": "str", "email": "str", "website": "str", "social": "dict",
+    "campusProximity": "dict", "isFeatured": "bool", "tags": "tags",
+    "joinDate": "dict", "authorizedBy": "dict", "contactTitle": "dict",
+    "latitude": "f64", "longitude": "f64", "nearestCampus": "dict", "campusDistanceMiles": "f64"
+}
+
+ROW_CODES = {"roles": "B", "bool": "B", "f64": "d"}
+# Bytes buffered per column before they are spilled to disk
+SPILL_BUFFER = 1 << 20
+
+def snapshot_path(csv_path):
+    """categorized_discounts.csv -> categorized_discounts.snapshot"""
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_SUFFIX
+
+def roles_mask(roles):
+    mask = 0
+    for role in roles:
+        if role not in ROLES:
+            raise ValueError(f"unknown eligibility role {role!r}")
+        mask |= 1 << ROLES.index(role)
+    if roles_from_mask(mask) != tuple(roles):
+        raise ValueError(f"roles {roles!r} are not in canonical order")
+    return mask
+
+def roles_from_mask(mask):
+    return roles_tuple([role for bit, role in enumerate(ROLES) if mask & (1 << bit)])
+
+def to_little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def typed_array(code, data):
+    """array of code from little-endian bytes (or a memoryview of them)."""
+    values = array(code)
+    values.frombytes(data)
+    return to_little_endian(values)
+
+def write_snapshot(discounts, path, source_hash):
+    """
+    Writes discounts (any iterable) to path. Rows are spilled column by
+    column as they arrive (to disk once a column outgrows SPILL_BUFFER), so
+    memory stays flat; the file is assembled and swapped in at the end.
+    Returns the row count.
+    """
+    columns = {}
+    for field, kind in SNAPSHOT_COLUMNS.items():
+        column = {"kind": kind, "spill": tempfile.SpooledTemporaryFile(SPILL_BUFFER), "buffer": bytearray()}
+        if kind == "str":
+            column["lengths"] = tempfile.SpooledTemporaryFile(SPILL_BUFFER)
+            column["lengthBuffer"] = bytearray()
+        if kind in ("dict", "tags"):
+            column["codes"] = {}
+        columns[field] = column
+
+    count = 0
+    tmp_path = path + ".tmp"
+    try:
+        for discount in discounts:
+            for field, value in zip(DISCOUNT_FIELDS, discount):
+                write_value(columns[field], value)
+            count += 1
+        for column in columns.values():
+            flush_column(column)
+
+        header = {"version": SNAPSHOT_VERSION, "rows": count, "sourceHash": source_hash,
+                  "roles": list(ROLES), "columns": []}
+        offset = 0
+        for field, column in columns.items():
+            entry = {"name": field, "kind": column["kind"], "offset": offset}
+            if "codes" in column:
+                entry["dictionary"] = [list(value) if isinstance(value, tuple) else value
+                                       for value in column["codes"]]
+                entry["width"] = 2 if len(column["codes"]) <= 0xFFFF else 4
+                recode_width(column, count, entry["width"])
+            entry["size"] = sum(f.seek(0, os.SEEK_END) for f in spill_files(column))
+            offset += entry["size"]
+            header["columns"].append(entry)
+
+        encoded = json.dumps(header, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        with open(tmp_path, 'wb') as out:
+            out.write(SNAPSHOT_MAGIC + struct.pack("<I", len(encoded)) + encoded)
+            for column in columns.values():
+                for f in spill_files(column):
+                    f.seek(0)
+                    shutil.copyfileobj(f, out)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        for column in columns.values():
+            for f in spill_files(column):
+                f.close()
+    return count
+
+def spill_files(column):
+    return [column["lengths"], column["spill"]] if "lengths" in column else [column["spill"]]
+
+def write_value(column, value):
+    kind = column["kind"]
+    buffer = column["buffer"]
+    if kind == "str":
+        data = value.encode('utf-8')
+        column["lengthBuffer"] += struct.pack("<I", len(data))
+        buffer += data
+    elif kind in ("dict", "tags"):
+        # Codes are spilled as u32 and narrowed once the dictionary size is known
+        codes = column["codes"]
+        buffer += struct.pack("<I", codes.setdefault(value, len(codes)))
+    elif kind == "roles":
+        buffer.append(roles_mask(value))
+    elif kind == "bool":
+        buffer.append(1 if value else 0)
+    else:
+        buffer += struct.pack("<d", math.nan if value is None else value)
+    if len(buffer) >= SPILL_BUFFER:
+        flush_column(column)
+
+def flush_column(column):
+    column["spill"].write(column["buffer"])
+    column["buffer"].clear()
+    if "lengths" in column:
+        column["lengths"].write(column["lengthBuffer"])
+        column["lengthBuffer"].clear()
+
+def recode_width(column, count, width):
+    """Rewrites a dictionary column's spilled u32 codes as width-byte codes."""
+    if width == 4:
+        return
+    spill = column["spill"]
+    spill.seek(0)
+    codes = typed_array("I", spill.read(count * 4))
+    spill.seek(0)
+    spill.truncate()
+    spill.write(to_little_endian(array("H", codes)).tobytes())
+
+def read_header(view):
+    if bytes(view[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+        raise ValueError("not a catalog snapshot")
+    start = len(SNAPSHOT_MAGIC) + 4
+    (length,) = struct.unpack_from("<I", view, len(SNAPSHOT_MAGIC))
+    header = json.loads(bytes(view[start:start + length]))
+    if header.get("version") != SNAPSHOT_VERSION or [c["name"] for c in header["columns"]] != DISCOUNT_FIELDS:
+        raise ValueError("snapshot was written by a different version")
+    return header, start + length
+
+def read_column(view, entry, rows):
+    """Decoded values of one column section."""
+    kind = entry["kind"]
+    if kind == "str":
+        lengths = typed_array("I", view[:rows * 4])
+        data = view[rows * 4:]
+        text = str(data, 'utf-8')
+        if len(text) != len(data):
+            # Byte lengths only line up with characters in pure-ASCII columns
+            return [str(data[end - length:end], 'utf-8') for end, length in zip(accumulate(lengths), lengths)]
+        return [text[end - length:end] for end, length in zip(accumulate(lengths), lengths)]
+    if kind in ("dict", "tags"):
+        dictionary = entry["dictionary"]
+        if kind == "tags":
+            dictionary = [tuple(sys.intern(tag) for tag in tags) for tags in dictionary]
+        else:
+            dictionary = [sys.intern(value) for value in dictionary]
+        codes = typed_array("H" if entry["width"] == 2 else "I", view)
+        return [dictionary[code] for code in codes]
+    values = typed_array(ROW_CODES[kind], view)
+    if kind == "roles":
+        by_mask = [roles_from_mask(mask) for mask in range(1 << len(ROLES))]
+        return [by_mask[mask] for mask in values]
+    if kind == "bool":
+        return list(map(bool, values))
+    return [None if value != value else value for value in values]  # NaN != NaN
+
+def read_snapshot(path):
+    """
+    {"sourceHash", "discounts"} from a snapshot file, memory-mapped so each
+    column is decoded straight from the page cache. Raises FileNotFoundError,
+    or ValueError for a file this version cannot read.
+    """
+    # Decoding allocates several objects per row and none of them can form a
+    # cycle, so the cyclic collector is paused instead of rescanning them
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        return decode_snapshot(path)
+    finally:
+        if collecting:
+            gc.enable()
+
+def decode_snapshot(path):
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                header, base = read_header(view)
+                rows = header["rows"]
+                columns = [read_column(view[base + c["offset"]:base + c["offset"] + c["size"]], c, rows)
+                           for c in header["columns"]]
+            finally:
+                view.release()
+    return {"sourceHash": header["sourceHash"],
+            "discounts": list(map(Discount._make, zip(*columns)))}
@@ -1,20 +1,20 @@
-import urllib.request
 import csv
-import io
 
-url = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQregHbek9Lten27U-Hs92yB81IoGO3PyJGOOekrIkTeXpI9XRV-YMaw-DNTZk-MCQTEhLcqkB3kMF5/pub?output=csv"
-response = urllib.request.urlopen(url)
-csv_data = response.read().decode('utf-8')
-f = io.StringIO(csv_data)
-reader = csv.DictReader(f)
+from fetch_and_process import GOOGLE_SHEET_URL
+from sheet_fetch import fetch_with_retries
 
-categories = set()
-for row in reader:
-    cat = row.get("Category", "").strip()
-    if cat:
-        categories.add(cat)
-    else:
-        categories.add("Other")
+# Reuses the shared fetch cache, so an unchanged sheet costs a single 304
+result = fetch_with_retries(GOOGLE_SHEET_URL)
+with open(result.path, 'r', encoding='utf-8', newline='') as f:
+    reader = csv.DictReader(f)
+
+    categories = set()
+    for row in reader:
+        cat = row.get("Category", "").strip()
+        if cat:
+            categories.add(cat)
+        else:
+            categories.add("Other")
 
 print("Unique Categories:")
 for c in sorted(list(categories)):
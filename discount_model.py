@@ -0,0 +1,144 @@
+import csv
+import sys
+from collections import namedtuple
+
+# One partner discount, the same shape in every script. whoCanRedeem and tags
+# are tuples, isFeatured a bool, and latitude/longitude/campusDistanceMiles
+# floats or None; the codecs below convert to and from the CSV and page forms.
+DISCOUNT_FIELDS = [
+    "id", "businessName", "category", "discountAmount", "whoCanRedeem",
+    "howToRedeem", "description", "address", "phone", "email",
+    "website", "social", "campusProximity", "isFeatured", "tags",
+    "joinDate", "authorizedBy", "contactTitle",
+    "latitude", "longitude", "nearestCampus", "campusDistanceMiles"
+]
+
+# Everything but id and businessName is optional
+DISCOUNT_DEFAULTS = {
+    "whoCanRedeem": (), "social": "", "campusProximity": "RGV Area", "isFeatured": False, "tags": (),
+    "latitude": None, "longitude": None, "campusDistanceMiles": None
+}
+
+# A namedtuple stores its fields in the tuple itself (no per-record __dict__)
+Discount = namedtuple("Discount", DISCOUNT_FIELDS,
+                      defaults=[DISCOUNT_DEFAULTS.get(field, "") for field in DISCOUNT_FIELDS[2:]])
+
+# Columns of categorized_discounts.csv, in order
+CSV_FIELDNAMES = [
+    "id", "businessName", "category", "discountAmount", "whoCanRedeem",
+    "howToRedeem", "description", "address", "phone", "email",
+    "website", "campusProximity", "isFeatured", "tags",
+    "joinDate", "authorizedBy", "contactTitle",
+    "latitude", "longitude", "nearestCampus", "campusDistanceMiles"
+]
+
+# Eligibility roles in canonical order; bitmasks (snapshot, page filters) use bit i for ROLES[i]
+ROLES = ("Students", "Faculty", "Staff", "Alumni")
+
+# Interned tuples per distinct "A;B" role string: every record redeemable by
+# the same roles shares one tuple of shared strings
+_role_tuples = {}
+
+def roles_tuple(roles):
+    """Shared tuple for roles, given as a list or the CSV's ';'-joined string."""
+    key = roles if isinstance(roles, str) else ";".join(roles)
+    cached = _role_tuples.get(key)
+    if cached is None:
+        cached = _role_tuples[key] = tuple(sys.intern(role.strip()) for role in key.split(";") if role.strip())
+    return cached
+
+def new_discount(**fields):
+    """A Discount with category, roles and tags interned; missing fields take their defaults."""
+    if "category" in fields:
+        fields["category"] = sys.intern(fields["category"])
+    if "whoCanRedeem" in fields:
+        fields["whoCanRedeem"] = roles_tuple(fields["whoCanRedeem"])
+    if "tags" in fields:
+        fields["tags"] = tuple(sys.intern(tag) for tag in fields["tags"])
+    if fields.get("nearestCampus"):
+        fields["nearestCampus"] = sys.intern(fields["nearestCampus"])
+    return Discount(**fields)
+
+def parse_float(value):
+    """CSV number -> float, or None for an empty cell (an address that could not be placed)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def csv_cell(value):
+    return "" if value is None else str(value)
+
+# --- CSV codec ---
+def from_csv_row(row):
+    """Discount from a categorized_discounts.csv row (a dict)."""
+    get = row.get
+    return Discount(
+        row["id"], row["businessName"], sys.intern(get("category", "")), get("discountAmount", ""),
+        roles_tuple(get("whoCanRedeem", "")), get("howToRedeem", ""), get("description", ""),
+        get("address", ""), get("phone", ""), get("email", ""), get("website", ""), "",
+        get("campusProximity", ""), get("isFeatured", "False") == "True",
+        (sys.intern(get("tags", "")),), get("joinDate", ""), get("authorizedBy", ""), get("contactTitle", ""),
+        parse_float(get("latitude")), parse_float(get("longitude")),
+        sys.intern(get("nearestCampus", "")), parse_float(get("campusDistanceMiles"))
+    )
+
+def to_csv_row(d):
+    """categorized_discounts.csv row (a dict of strings) for d."""
+    return {
+        "id": d.id, "businessName": d.businessName, "category": d.category,
+        "discountAmount": d.discountAmount, "whoCanRedeem": ";".join(d.whoCanRedeem),
+        "howToRedeem": d.howToRedeem, "description": d.description, "address": d.address,
+        "phone": d.phone, "email": d.email, "website": d.website,
+        "campusProximity": d.campusProximity, "isFeatured": str(d.isFeatured),
+        # The CSV keeps one tag per partner
+        "tags": d.tags[0] if d.tags else "",
+        "joinDate": d.joinDate, "authorizedBy": d.authorizedBy, "contactTitle": d.contactTitle,
+        "latitude": csv_cell(d.latitude), "longitude": csv_cell(d.longitude),
+        "nearestCampus": d.nearestCampus, "campusDistanceMiles": csv_cell(d.campusDistanceMiles)
+    }
+
+def iter_csv(path):
+    """Yields the discounts of a categorized_discounts.csv file, in order."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            yield from_csv_row(row)
+
+# --- JSON codec ---
+def to_json(d):
+    """The object the page reads for d (see DISCOUNTS in build_html.py)."""
+    return {
+        "id": d.id, "businessName": d.businessName, "category": d.category,
+        "discountAmount": d.discountAmount, "whoCanRedeem": list(d.whoCanRedeem),
+        "howToRedeem": d.howToRedeem, "description": d.description, "address": d.address,
+        "phone": d.phone, "email": d.email, "website": d.website, "social": d.social,
+        "campusProximity": d.campusProximity, "lat": d.latitude, "lng": d.longitude,
+        "isFeatured": d.isFeatured, "tags": list(d.tags),
+        "joinDate": d.joinDate, "authorizedBy": d.authorizedBy, "contactTitle": d.contactTitle
+    }
+
+def from_json(item):
+    """Discount from a page object produced by to_json()."""
+    return new_discount(
+        id=item["id"], businessName=item["businessName"], category=item.get("category", ""),
+        discountAmount=item.get("discountAmount", ""), whoCanRedeem=item.get("whoCanRedeem", []),
+        howToRedeem=item.get("howToRedeem", ""), description=item.get("description", ""),
+        address=item.get("address", ""), phone=item.get("phone", ""), email=item.get("email", ""),
+        website=item.get("website", ""), social=item.get("social", ""),
+        campusProximity=item.get("campusProximity", ""), isFeatured=bool(item.get("isFeatured")),
+        tags=item.get("tags", []), joinDate=item.get("joinDate", ""),
+        authorizedBy=item.get("authorizedBy", ""), contactTitle=item.get("contactTitle", ""),
+        latitude=item.get("lat"), longitude=item.get("lng")
+    )
+
+# --- Columnar batch ---
+def to_columns(discounts):
+    """{field: [value per discount]}: one list per field instead of one record per discount."""
+    columns = {field: [] for field in DISCOUNT_FIELDS}
+    for field, values in zip(DISCOUNT_FIELDS, zip(*discounts)):
+        columns[field] = list(values)
+    return columns
+
+def from_columns(columns):
+    """Discounts of a batch made by to_columns(), in order."""
+    return [Discount._make(values) for values in zip(*(columns[field] for field in DISCOUNT_FIELDS))]
@@ -1,12 +1,25 @@
 import csv
 import json
-import urllib.request
-import io
+import os
+import sys
+
+from catalog_delta import diff_rows, load_row_digests, new_delta, snapshot_hash, write_delta
+from catalog_snapshot import snapshot_path, write_snapshot
+from geocode import geocode_cache_path, load_geocoder, locate, proximity_label, save_geocoder
+from discount_model import CSV_FIELDNAMES, iter_csv, new_discount, to_csv_row
+from discount_ids import assign_id, id_registry_path, identity_key, load_id_registry, save_id_registry
+from sheet_fetch import FETCH_CACHE_DIR, cache_paths, fetch_many
 
 # Configuration
 GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQregHbek9Lten27U-Hs92yB81IoGO3PyJGOOekrIkTeXpI9XRV-YMaw-DNTZk-MCQTEhLcqkB3kMF5/pub?output=csv"
 OUTPUT_CSV = "categorized_discounts.csv"
 
+# Optional list of sheets to merge, e.g. department and alumni-association
+# sheets next to the main one: [{"name": "alumni", "url": "https://...", "timeout": 20}].
+# "timeout" (seconds) and "retries" are optional per source.
+# Sources listed first win when the same business appears in several.
+SHEET_SOURCES_FILE = "sheet_sources.json"
+
 def parse_who_can_redeem(text):
     """Parses the 'Who Can Redeem' text into a list."""
     roles = []
@@ -20,106 +33,231 @@ def parse_who_can_redeem(text):
         return ["Students", "Faculty", "Staff"] # Default fallback
     return roles
 
-def main():
-    print(f"Downloading data from {GOOGLE_SHEET_URL}...")
+def process_row(row, id_registry, geocoder):
+    """Transforms one sheet row into a Discount, or None if it should be skipped."""
+    # Headers: 'Name of the Business', 'Discount Amount', 'Who Can Redeem', 'How to Redeem', 'About this Business', 'Address', 'Phone', 'Email address', 'Website/Social Media', 'Category', 'VDP Join Date', 'Authorized by', 'Contact Title/Role'
+
+    # Extract fields safely
+    name = row.get("Name of the Business", "").strip()
+    if not name: return None # Skip empty rows
+
+    discount = row.get("Discount Amount", "")
+    who_raw = row.get("Who Can Redeem", "")
+    how = row.get("How to Redeem", "")
+    about = row.get("About this Business", "")
+    address = row.get("Address", "")
+    phone = row.get("Phone", "")
+    email = row.get("Email address", "")
+    website = row.get("Website/Social Media", "")
+
+    # New Fields
+    category = row.get("Category", "").strip()
+    if not category:
+        category = "Other"
+
+    join_date = row.get("VDP Join Date", "")
+    authorized_by = row.get("Authorized by", "")
+    contact_title = row.get("Contact Title/Role", "")
+
+    # Process specific fields
+    who_list = parse_who_can_redeem(who_raw)
+
+    # Distance to the closest UTRGV campus, from the geocoded address
+    located = locate(geocoder, address)
+    proximity = proximity_label(located)
+    located = located or {}
+
+    # Feature flag logic
+    is_featured = False
+    if "free" in discount.lower() or "25%" in discount or "20%" in discount:
+         is_featured = True
+
+    # Construct new record
+    return new_discount(
+        id=assign_id(id_registry, name, address),
+        businessName=name,
+        category=category,
+        discountAmount=discount,
+        whoCanRedeem=who_list,
+        howToRedeem=how,
+        description=about,
+        address=address,
+        phone=phone,
+        email=email,
+        website=website,
+        campusProximity=proximity,
+        isFeatured=is_featured,
+        tags=[category.split(" ")[0].lower()], # First word of category as tag
+
+        # New Internal Fields
+        joinDate=join_date,
+        authorizedBy=authorized_by,
+        contactTitle=contact_title,
+        latitude=located.get("latitude"),
+        longitude=located.get("longitude"),
+        nearestCampus=located.get("nearestCampus", ""),
+        campusDistanceMiles=located.get("campusDistanceMiles")
+    )
+
+def load_sheet_sources(path=SHEET_SOURCES_FILE, default_url=GOOGLE_SHEET_URL):
+    """The configured sources; just the main partner sheet when path does not exist."""
     try:
-        response = urllib.request.urlopen(GOOGLE_SHEET_URL)
-        csv_data = response.read().decode('utf-8')
-    except Exception as e:
-        print(f"Error downloading data: {e}")
-        return
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return [{"name": "partners", "url": default_url}]
 
-    # Parse CSV
-    print("Processing data...")
-    f = io.StringIO(csv_data)
-    reader = csv.DictReader(f)
+def iter_merged_rows(paths, id_registry, geocoder, stats):
+    """
+    Yields Discounts from several downloaded sheets in order. A business
+    already seen in an earlier sheet is skipped (counted in stats["duplicates"]);
+    repeats inside one sheet are kept as before.
+    """
+    seen = set()
+    for path in paths:
+        keys = set()
+        with open(path, 'r', encoding='utf-8', newline='') as lines:
+            for row in csv.DictReader(lines):
+                key = identity_key(row.get("Name of the Business", "").strip(), row.get("Address", ""))
+                if key in seen:
+                    stats["duplicates"] += 1
+                    continue
+                discount = process_row(row, id_registry, geocoder)
+                if discount is None:
+                    continue
+                keys.add(key)
+                yield discount
+        seen |= keys
 
-    processed_rows = []
-    row_id = 100 # Start IDs from 100
+def fetch_sources(sources, cache_dir=FETCH_CACHE_DIR):
+    """
+    Downloads every source concurrently. Returns (paths, changed), or None when a
+    source failed and has no cached copy to fall back on.
+    """
+    fetches = fetch_many(sources, cache_dir)
+    paths = []
+    changed = False
+    for source, fetch in zip(sources, fetches):
+        if fetch.error is None:
+            print(f"  {source['name']}: {'downloaded' if fetch.result.changed else 'not modified'} "
+                  f"in {fetch.seconds:.1f}s")
+            paths.append(fetch.result.path)
+            changed = changed or fetch.result.changed
+            continue
+        cached = cache_paths(source["url"], cache_dir)[0]
+        if not os.path.exists(cached):
+            # Dropping the source would read as every one of its partners leaving
+            print(f"Error downloading {source['name']}: {fetch.error}")
+            return None
+        print(f"  {source['name']}: failed ({fetch.error}); using the last downloaded copy")
+        paths.append(cached)
+    return paths, changed
 
-    # Headers: 'Name of the Business', 'Discount Amount', 'Who Can Redeem', 'How to Redeem', 'About this Business', 'Address', 'Phone', 'Email address', 'Website/Social Media', 'Category', 'VDP Join Date', 'Authorized by', 'Contact Title/Role'
+# Bumped whenever processing changes what a sheet turns into (columns, ids,
+# geocoding), so the next run reprocesses an unchanged sheet
+PROCESSING_VERSION = 1
 
-    for row in reader:
-        # Extract fields safely
-        name = row.get("Name of the Business", "").strip()
-        if not name: continue # Skip empty rows
-
-        discount = row.get("Discount Amount", "")
-        who_raw = row.get("Who Can Redeem", "")
-        how = row.get("How to Redeem", "")
-        about = row.get("About this Business", "")
-        address = row.get("Address", "")
-        phone = row.get("Phone", "")
-        email = row.get("Email address", "")
-        website = row.get("Website/Social Media", "")
-
-        # New Fields
-        category = row.get("Category", "").strip()
-        if not category:
-            category = "Other"
-
-        join_date = row.get("VDP Join Date", "")
-        authorized_by = row.get("Authorized by", "")
-        contact_title = row.get("Contact Title/Role", "")
-
-        # Process specific fields
-        who_list = parse_who_can_redeem(who_raw)
-
-        # Proximity logic (simple guess)
-        proximity = "RGV Area"
-        if "," in address:
-            parts = address.split(",")
-            # usually "Street, City, Zip"
-            if len(parts) >= 2:
-                proximity = "Near " + parts[-2].strip() # City
-
-        # Feature flag logic
-        is_featured = False
-        if "free" in discount.lower() or "25%" in discount or "20%" in discount:
-             is_featured = True
-
-        # Construct new row
-        new_row = {
-            "id": str(row_id),
-            "businessName": name,
-            "category": category,
-            "discountAmount": discount,
-            "whoCanRedeem": ";".join(who_list), # Join with ; for CSV storage
-            "howToRedeem": how,
-            "description": about,
-            "address": address,
-            "phone": phone,
-            "email": email,
-            "website": website,
-            "campusProximity": proximity,
-            "isFeatured": str(is_featured),
-            "tags": category.split(" ")[0].lower(), # First word of category as tag
-
-            # New Internal Fields
-            "joinDate": join_date,
-            "authorizedBy": authorized_by,
-            "contactTitle": contact_title
-        }
-
-        processed_rows.append(new_row)
-        row_id += 1
-
-    # Write to Output CSV
-    print(f"Writing {len(processed_rows)} entries to {OUTPUT_CSV}...")
-    fieldnames = [
-        "id", "businessName", "category", "discountAmount", "whoCanRedeem",
-        "howToRedeem", "description", "address", "phone", "email",
-        "website", "campusProximity", "isFeatured", "tags",
-        "joinDate", "authorizedBy", "contactTitle"
-    ]
-
-    with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in processed_rows:
-            writer.writerow(row)
+def ingest_stamp_path(output_csv):
+    """categorized_discounts.csv -> categorized_discounts.ingest.json"""
+    return os.path.splitext(output_csv)[0] + ".ingest.json"
+
+def ingest_stamp(paths, geocoder_name):
+    """What an output is processed from: the processing version, the geocoder and each sheet body's hash."""
+    return {"version": PROCESSING_VERSION, "geocoder": geocoder_name,
+            "sources": [snapshot_hash(path) for path in paths]}
+
+def load_ingest_stamp(output_csv):
+    try:
+        with open(ingest_stamp_path(output_csv), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def save_ingest_stamp(stamp, output_csv):
+    with open(ingest_stamp_path(output_csv), 'w', encoding='utf-8') as f:
+        json.dump(stamp, f, indent=2)
+
+def write_rows(rows, output_path):
+    """Streams rows into output_path, replacing it only once every row is written."""
+    # Write next to the target and swap in at the end, so a download that
+    # fails half-way never leaves a truncated CSV behind.
+    tmp_path = output_path + ".tmp"
+    count = 0
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+def write_catalog_snapshot(output_csv):
+    """Writes the binary columnar snapshot the build loads instead of parsing the CSV."""
+    path = snapshot_path(output_csv)
+    try:
+        write_snapshot(iter_csv(output_csv), path, snapshot_hash(output_csv))
+    except ValueError as e:
+        # The snapshot records the CSV it matches, so a stale one is never used
+        print(f"Warning: could not write {path} ({e}); the build will read {output_csv} instead.")
+
+def main(url=GOOGLE_SHEET_URL, output_csv=OUTPUT_CSV, force=False, sources=None, geocoder_name="gazetteer"):
+    """Returns True when the output was written, False when the sheets were unchanged, or None when the ingest failed."""
+    sources = sources or load_sheet_sources(default_url=url)
+    print(f"Downloading data from {len(sources)} source(s)...")
+    fetched = fetch_sources(sources)
+    if fetched is None:
+        return None
+    paths, _ = fetched
+
+    # Skipped only when these exact bodies were processed successfully by this
+    # version and geocoder; a run that failed half-way is retried even if the
+    # sheet now answers 304
+    stamp = ingest_stamp(paths, geocoder_name)
+    if os.path.exists(output_csv) and load_ingest_stamp(output_csv) == stamp and not force:
+        print("Sheet not modified since last processed; nothing to do.")
+        return False
+
+    print(f"Processing data into {output_csv}...")
+    # Ids come from the business identity, not the row number, so inserting
+    # or reordering sheet rows never renumbers existing partners
+    id_registry = load_id_registry(id_registry_path(output_csv), seed_csv=output_csv)
+    geocoder = load_geocoder(geocoder_name, geocode_cache_path(output_csv))
+
+    # Diff against the previous snapshot by id while streaming, for the delta file
+    previous = load_row_digests(output_csv)
+    delta = new_delta(snapshot_hash(output_csv))
+    stats = {"duplicates": 0}
+    try:
+        discounts = iter_merged_rows(paths, id_registry, geocoder, stats)
+        rows = diff_rows((to_csv_row(d) for d in discounts), previous, delta, output_csv)
+        count = write_rows(rows, output_csv)
+    except Exception as e:
+        print(f"Error processing data: {e}")
+        return None
+    save_id_registry(id_registry, id_registry_path(output_csv))
+    save_geocoder(geocoder, geocode_cache_path(output_csv))
+    if geocoder["lookups"]:
+        print(f"Geocoded {geocoder['lookups']} new addresses with {geocoder_name}.")
+    write_delta(delta, snapshot_hash(output_csv), output_csv)
+    write_catalog_snapshot(output_csv)
+    save_ingest_stamp(stamp, output_csv)
+    print(f"Changes: {delta['addedCount']} added, {len(delta['removed'])} removed, "
+          f"{delta['modifiedCount']} modified.")
 
+    if stats["duplicates"]:
+        print(f"Skipped {stats['duplicates']} rows already listed by an earlier source.")
+    print(f"Wrote {count} entries to {output_csv}.")
     print("Done!")
+    return True
 
 if __name__ == "__main__":
-    main()
+    # --geocoder=nominatim for street-level coordinates; the default is the offline gazetteer
+    geocoder_name = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--geocoder=")), "gazetteer")
+    # A failed ingest must not pass for an unchanged sheet in cron
+    if main(force="--force" in sys.argv, geocoder_name=geocoder_name) is None:
+        sys.exit(1)
@@ -0,0 +1,228 @@
+import json
+import math
+import os
+import re
+import time
+import urllib.parse
+
+from catalog_indexes import tokenize
+from sheet_fetch import fetch_with_retries
+
+# Persisted normalized address -> coordinates, so each address is geocoded once;
+# kept in the output CSV's directory
+GEOCODE_CACHE = "geocode_cache.json"
+# Bump when the gazetteer below changes, so its old answers are recomputed
+GAZETTEER_VERSION = 2
+
+# UTRGV campuses and sites (lat, lng)
+CAMPUSES = {
+    "Edinburg": (26.3050, -98.1735),
+    "Brownsville": (25.8967, -97.4914),
+    "Harlingen": (26.1704, -97.7254),
+    "McAllen": (26.1853, -98.2236),
+    "Rio Grande City": (26.3798, -98.8203),
+    "South Padre Island": (26.0838, -97.1658),
+}
+
+# Approximate centroids of Rio Grande Valley cities (lat, lng)
+RGV_CITIES = {
+    "alamo": (26.1837, -98.1231),
+    "brownsville": (25.9017, -97.4975),
+    "donna": (26.1703, -98.0519),
+    "edcouch": (26.2945, -97.9606),
+    "edinburg": (26.3017, -98.1633),
+    "elsa": (26.2934, -97.9931),
+    "harlingen": (26.1906, -97.6961),
+    "hidalgo": (26.1003, -98.2631),
+    "la feria": (26.1590, -97.8239),
+    "la joya": (26.2470, -98.4814),
+    "laguna vista": (26.1009, -97.2903),
+    "los fresnos": (26.0717, -97.4764),
+    "lyford": (26.4137, -97.7897),
+    "mcallen": (26.2034, -98.2300),
+    "mercedes": (26.1498, -97.9136),
+    "mission": (26.2159, -98.3253),
+    "palmhurst": (26.2581, -98.3175),
+    "palmview": (26.2334, -98.3711),
+    "penitas": (26.2306, -98.4442),
+    "pharr": (26.1948, -98.1836),
+    "port isabel": (26.0734, -97.2086),
+    "primera": (26.2237, -97.7583),
+    "progreso": (26.0923, -97.9572),
+    "raymondville": (26.4815, -97.7831),
+    "rio grande city": (26.3798, -98.8203),
+    "roma": (26.4053, -99.0159),
+    "san benito": (26.1326, -97.6311),
+    "san juan": (26.1892, -98.1553),
+    "santa rosa": (26.2565, -97.8253),
+    "south padre island": (26.1118, -97.1681),
+    "weslaco": (26.1595, -97.9908),
+}
+
+# Approximate centroids of RGV ZIP codes (lat, lng); more precise than the city
+RGV_ZIPS = {
+    "78501": (26.2154, -98.2364), "78503": (26.1687, -98.2517), "78504": (26.2627, -98.2289),
+    "78516": (26.1837, -98.1190), "78520": (25.9290, -97.5196), "78521": (25.9222, -97.4206),
+    "78526": (25.9731, -97.4694), "78537": (26.1680, -98.0522), "78539": (26.2800, -98.1830),
+    "78541": (26.4514, -98.1844), "78542": (26.2503, -98.0631), "78550": (26.1961, -97.6911),
+    "78552": (26.1872, -97.7486), "78557": (26.1003, -98.2458), "78559": (26.1644, -97.8264),
+    "78566": (26.0900, -97.4500), "78570": (26.1497, -97.9147), "78572": (26.2307, -98.3403),
+    "78573": (26.2867, -98.3644), "78574": (26.3050, -98.4100), "78577": (26.1869, -98.1864),
+    "78578": (26.0733, -97.2414), "78580": (26.4814, -97.7833), "78582": (26.3811, -98.8197),
+    "78586": (26.1322, -97.6342), "78589": (26.2033, -98.1547), "78596": (26.1553, -97.9911),
+    "78597": (26.1819, -97.1769), "78599": (26.1881, -97.9717),
+}
+
+# Words that make a preceding city name a street name ("Mission St", "San Juan Ave")
+STREET_SUFFIXES = {
+    "st", "street", "rd", "road", "ave", "avenue", "blvd", "boulevard", "dr", "drive",
+    "ln", "lane", "hwy", "highway", "pkwy", "parkway", "expy", "expressway", "fwy",
+    "freeway", "ct", "court", "cir", "circle", "pl", "place", "trl", "trail", "way", "loop",
+}
+
+ZIP_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+EARTH_RADIUS_MILES = 3958.8
+
+def normalize_address(address):
+    """Cache key for an address: case, punctuation and spacing folded away."""
+    return " ".join(tokenize(address))
+
+def gazetteer_provider(address):
+    """Offline lookup of the ZIP code, then the city, named in address."""
+    for match in ZIP_PATTERN.finditer(address):
+        if match.group(1) in RGV_ZIPS:
+            lat, lng = RGV_ZIPS[match.group(1)]
+            return {"lat": lat, "lng": lng, "precision": "zip"}
+    # The first city named wins ("Multiple Locations (Edinburg, Harlingen)"),
+    # unless the name is part of a street ("1200 N Alamo Rd, Edinburg")
+    words = normalize_address(address).split()
+    for start in range(len(words)):
+        for city in RGV_CITIES:
+            end = start + city.count(" ") + 1
+            if " ".join(words[start:end]) == city and (end == len(words) or words[end] not in STREET_SUFFIXES):
+                lat, lng = RGV_CITIES[city]
+                return {"lat": lat, "lng": lng, "precision": "city"}
+    return None
+
+# Public Nominatim allows one request per second and requires an identifying User-Agent
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_USER_AGENT = "vaquero-discounts-ingest"
+NOMINATIM_CACHE_DIR = ".geocode_http_cache"
+_last_nominatim_call = [0.0]
+
+def nominatim_provider(address):
+    """Street-level lookup through OpenStreetMap Nominatim (needs network access)."""
+    wait = 1.0 - (time.monotonic() - _last_nominatim_call[0])
+    if wait > 0:
+        time.sleep(wait)
+    _last_nominatim_call[0] = time.monotonic()
+    query = urllib.parse.urlencode({"q": address, "format": "json", "limit": 1, "countrycodes": "us"})
+    result = fetch_with_retries(f"{NOMINATIM_URL}?{query}", NOMINATIM_CACHE_DIR,
+                                headers={"User-Agent": NOMINATIM_USER_AGENT})
+    with open(result.path, 'r', encoding='utf-8') as f:
+        matches = json.load(f)
+    if not matches:
+        return None
+    return {"lat": float(matches[0]["lat"]), "lng": float(matches[0]["lon"]), "precision": "street"}
+
+GEOCODERS = {
+    "gazetteer": gazetteer_provider,
+    "nominatim": nominatim_provider,
+}
+
+# How precise each provider's answers are; switching to a more precise one
+# re-geocodes addresses cached from a less precise one
+GEOCODER_PRECISION = {
+    "gazetteer": 0,
+    "nominatim": 1,
+}
+
+def geocode_cache_path(output_csv):
+    return os.path.join(os.path.dirname(output_csv), GEOCODE_CACHE)
+
+def load_geocoder(provider="gazetteer", path=GEOCODE_CACHE):
+    """Geocoding state: the chosen provider plus the persistent cache."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        entries = {}
+    return {"provider": provider, "entries": entries, "dirty": False, "lookups": 0}
+
+def save_geocoder(geocoder, path=GEOCODE_CACHE):
+    if not geocoder["dirty"]:
+        return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(geocoder["entries"], f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    geocoder["dirty"] = False
+
+def is_current(entry, provider):
+    """
+    Whether a cached entry still answers for provider: it was asked of a
+    provider at least as precise, and gazetteer answers match its version.
+    """
+    if entry.get("provider") == "gazetteer" and entry.get("version") != GAZETTEER_VERSION:
+        return False
+    # "requested" keeps a provider that found nothing from being asked again
+    requested = entry.get("requested", entry.get("provider"))
+    return GEOCODER_PRECISION.get(requested, 0) >= GEOCODER_PRECISION.get(provider, 0)
+
+def geocode(geocoder, address):
+    """Coordinates for address as {"lat", "lng", "precision"}, or None if it cannot be placed."""
+    key = normalize_address(address)
+    if not key:
+        return None
+    entry = geocoder["entries"].get(key)
+    if entry is None or not is_current(entry, geocoder["provider"]):
+        name = requested = geocoder["provider"]
+        try:
+            location = GEOCODERS[name](address)
+        except Exception as e:
+            # Fall back to the offline gazetteer, without caching, so the
+            # provider is asked again next run
+            print(f"Warning: {name} geocoding failed for {address!r} ({e}); using the gazetteer.")
+            return gazetteer_provider(address)
+        if location is None and name != "gazetteer":
+            name, location = "gazetteer", gazetteer_provider(address)
+        entry = {"provider": name, "requested": requested, "location": location}
+        if name == "gazetteer":
+            entry["version"] = GAZETTEER_VERSION
+        geocoder["entries"][key] = entry
+        geocoder["dirty"] = True
+        geocoder["lookups"] += 1
+    return entry["location"]
+
+def distance_miles(a, b):
+    """Great-circle distance between two (lat, lng) points."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(h))
+
+def nearest_campus(lat, lng):
+    """(campus name, miles) of the closest UTRGV campus."""
+    return min(((name, distance_miles((lat, lng), point)) for name, point in CAMPUSES.items()),
+               key=lambda pair: pair[1])
+
+def locate(geocoder, address):
+    """
+    Location fields for an address. Multi-location entries ("A; B") use
+    whichever location is closest to a campus.
+    """
+    best = None
+    for part in address.split(";"):
+        location = geocode(geocoder, part)
+        if location is None:
+            continue
+        campus, miles = nearest_campus(location["lat"], location["lng"])
+        if best is None or miles < best["campusDistanceMiles"]:
+            best = {"latitude": location["lat"], "longitude": location["lng"],
+                    "nearestCampus": campus, "campusDistanceMiles": round(miles, 1)}
+    return best
+
+def proximity_label(located):
+    """Human-readable campus proximity, e.g. '2.3 mi from UTRGV Edinburg'."""
+    if located is None:
+        return "RGV Area"
+    return f"{located['campusDistanceMiles']} mi from UTRGV {located['nearestCampus']}"
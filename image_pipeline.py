@@ -0,0 +1,153 @@
+import base64
+import hashlib
+import io
+import struct
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ICON_SOURCE = "icon.png"
+LOGO_SOURCE = "utrgv-logo.png"
+IMAGE_DIR = "assets"
+
+# 180 is the iOS home-screen size; 192 and 512 are what installable PWAs need
+APPLE_TOUCH_ICON_SIZE = 180
+MANIFEST_ICON_SIZES = (192, 512)
+# The header renders the logo 38px tall (.utrgv-logo-img)
+LOGO_HEIGHT = 38
+LOGO_DENSITIES = (1, 2)
+# Modern formats first; the browser takes the first <source> it supports
+LOGO_FORMATS = (("avif", "image/avif"), ("webp", "image/webp"))
+# Images at or below this size go into the page as data URIs instead of costing a request
+INLINE_IMAGE_LIMIT = 2048
+
+def png_size(data):
+    """(width, height) from a PNG's IHDR chunk."""
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("not a PNG file")
+    return struct.unpack(">II", data[16:24])
+
+def read_source(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        raise ValueError(f"image source {path} not found")
+
+def image_path(stem, data, extension):
+    return f"{IMAGE_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:10]}.{extension}"
+
+def encode(image, extension):
+    """Encoded bytes, or None when this Pillow build cannot write the format."""
+    out = io.BytesIO()
+    options = {"png": {"optimize": True}, "webp": {"quality": 85, "method": 6}, "avif": {"quality": 60}}
+    try:
+        image.save(out, extension.upper(), **options[extension])
+    except (KeyError, OSError, ValueError):
+        return None
+    return out.getvalue()
+
+def data_uri(data, mime):
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+def add_image(images, stem, data, extension, mime, inline=True):
+    """URL for a generated image: a data URI when it is tiny, otherwise a content-hashed file."""
+    if inline and len(data) <= INLINE_IMAGE_LIMIT:
+        return data_uri(data, mime)
+    path = image_path(stem, data, extension)
+    images["files"][path] = data
+    images["precache"].append(f"./{path}")
+    return path
+
+def add_source(images, path, inline=True):
+    """URL for a source image used as is (when Pillow is not installed)."""
+    data = read_source(path)
+    if inline and len(data) <= INLINE_IMAGE_LIMIT:
+        return data_uri(data, "image/png")
+    images["precache"].append(f"./{path}")
+    return path
+
+def build_icons(images):
+    """Manifest icon entries and the apple-touch-icon URL."""
+    data = read_source(ICON_SOURCE)
+    width, height = png_size(data)
+    if Image is None:
+        # One file, advertised at the size it actually is; never inlined, since
+        # manifests and home screens want real URLs
+        src = add_source(images, ICON_SOURCE, inline=False)
+        return [{"src": src, "sizes": f"{width}x{height}", "type": "image/png"}], src
+
+    source = Image.open(io.BytesIO(data)).convert("RGBA")
+    icons = []
+    for size in MANIFEST_ICON_SIZES:
+        if size > max(width, height):
+            print(f"Warning: {ICON_SOURCE} is {width}x{height}; skipping the upscaled {size}px icon.")
+            continue
+        png = encode(source.resize((size, size), Image.LANCZOS), "png")
+        icons.append({"src": add_image(images, f"icon-{size}", png, "png", "image/png", inline=False),
+                      "sizes": f"{size}x{size}", "type": "image/png"})
+    touch = encode(source.resize((APPLE_TOUCH_ICON_SIZE,) * 2, Image.LANCZOS), "png")
+    return icons, add_image(images, f"icon-{APPLE_TOUCH_ICON_SIZE}", touch, "png", "image/png", inline=False)
+
+def format_srcset(candidates):
+    return ", ".join(f"{url} {density}x" for url, density in candidates)
+
+def build_logo(images):
+    """{src, srcset, sources, width, height} for the header logo's <picture>."""
+    data = read_source(LOGO_SOURCE)
+    width, height = png_size(data)
+    display_width = round(width * LOGO_HEIGHT / height)
+    logo = {"width": display_width, "height": LOGO_HEIGHT, "sources": []}
+    if Image is None:
+        logo["src"] = add_source(images, LOGO_SOURCE)
+        logo["srcset"] = ""
+        return logo
+
+    source = Image.open(io.BytesIO(data)).convert("RGBA")
+    variants = {}
+    for density in LOGO_DENSITIES:
+        size = (min(width, display_width * density), min(height, LOGO_HEIGHT * density))
+        if any(size == seen for seen, _ in variants.values()):
+            continue
+        variants[density] = (size, source.resize(size, Image.LANCZOS))
+
+    def srcset(extension, mime):
+        """[(url, density)] for every variant, or None when Pillow cannot write the format."""
+        candidates = []
+        for density, (size, image) in variants.items():
+            encoded = encode(image, extension)
+            if encoded is None:
+                return None
+            candidates.append((add_image(images, f"utrgv-logo-{size[0]}", encoded, extension, mime), density))
+        return candidates
+
+    for extension, mime in LOGO_FORMATS:
+        candidates = srcset(extension, mime)
+        if candidates:
+            logo["sources"].append({"type": mime, "srcset": format_srcset(candidates)})
+        else:
+            print(f"Warning: this Pillow build cannot write {extension}; skipping it for the logo.")
+    png_candidates = srcset("png", "image/png")
+    logo["src"] = png_candidates[0][0]
+    logo["srcset"] = format_srcset(png_candidates)
+    return logo
+
+def build_images():
+    """
+    Generates the icon and logo variants. Returns the files to write, the URLs
+    to precache, the manifest icons, the apple-touch-icon and the logo markup data.
+    """
+    if Image is None:
+        print("Warning: Pillow not installed; using icon.png and utrgv-logo.png as they are.")
+    images = {"files": {}, "precache": []}
+    icons, apple_touch_icon = build_icons(images)
+    logo = build_logo(images)
+    return {
+        "files": images["files"],
+        "precache": images["precache"],
+        "icons": icons,
+        "appleTouchIcon": apple_touch_icon,
+        "logo": logo
+    }
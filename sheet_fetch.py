@@ -0,0 +1,361 @@
+import base64
+import filecmp
+import hashlib
+import http.client
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# On-disk cache shared by every script that reads the published sheet
+FETCH_CACHE_DIR = ".sheet_cache"
+# One JSON line per fetch (attempts, status, latency, bytes) for the cron job's dashboards
+FETCH_METRICS_FILE = "fetch_metrics.jsonl"
+
+# Seconds to establish a connection, to wait for each read, and for a
+# whole fetch including retries and backoff
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+FETCH_DEADLINE = 120
+FETCH_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+FETCH_RETRIES = 2
+RETRY_BACKOFF = 1.0
+MAX_REDIRECTS = 5
+# Upper bound on concurrent downloads when fetching several sources
+MAX_FETCH_WORKERS = 4
+CHUNK_SIZE = 64 * 1024
+
+# path: cached body on disk; changed: False when the server answered 304
+FetchResult = namedtuple("FetchResult", ["path", "changed"])
+
+# One entry of fetch_many(): result is None and error is set when every attempt failed
+SourceFetch = namedtuple("SourceFetch", ["url", "result", "error", "seconds"])
+
+# Keep-alive connections, one set per thread since http.client is not thread-safe
+_connections = threading.local()
+_metrics_lock = threading.Lock()
+
+def cache_paths(url, cache_dir=FETCH_CACHE_DIR):
+    """Returns the (body, metadata) file paths used to cache url."""
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, key + ".csv"), os.path.join(cache_dir, key + ".json")
+
+def load_cache_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def split_timeout(timeout):
+    """(connect, read) seconds from a single number or a pair."""
+    if timeout is None:
+        return FETCH_TIMEOUT
+    if isinstance(timeout, (int, float)):
+        return timeout, timeout
+    return tuple(timeout)
+
+def proxy_for(scheme, host):
+    """
+    (proxy host:port, Proxy-Authorization header or None) from HTTP(S)_PROXY,
+    honouring NO_PROXY as urllib does; None when host is reached directly.
+    """
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host.rsplit(":", 1)[0]):
+        return None
+    parts = urllib.parse.urlsplit(proxy if "://" in proxy else "http://" + proxy)
+    authorization = None
+    if parts.username:
+        credentials = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+        authorization = "Basic " + base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+    return parts.hostname + (f":{parts.port}" if parts.port else ""), authorization
+
+def get_connection(scheme, host, connect_timeout):
+    """A pooled keep-alive connection for (scheme, host), created on first use. Returns (conn, reused)."""
+    pool = getattr(_connections, "pool", None)
+    if pool is None:
+        pool = _connections.pool = {}
+    key = (scheme, host)
+    if key in pool:
+        return pool[key], True
+    connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+    proxy = proxy_for(scheme, host)
+    if proxy is None:
+        connection = connection_class(host, timeout=connect_timeout)
+        connection.proxied, connection.proxy_authorization = False, None
+    else:
+        proxy_host, authorization = proxy
+        connection = connection_class(proxy_host, timeout=connect_timeout)
+        if scheme == "https":
+            # HTTPS goes through a CONNECT tunnel; plain HTTP asks the proxy for the absolute URL
+            connection.set_tunnel(host, headers={"Proxy-Authorization": authorization} if authorization else None)
+        connection.proxied, connection.proxy_authorization = scheme == "http", authorization
+    pool[key] = connection
+    return connection, False
+
+def drop_connection_for(url):
+    parts = urllib.parse.urlsplit(url)
+    drop_connection(parts.scheme, parts.netloc)
+
+def drop_connection(scheme, host):
+    connection = getattr(_connections, "pool", {}).pop((scheme, host), None)
+    if connection is not None:
+        connection.close()
+
+def send_request(url, headers, timeout):
+    """Sends a GET over a pooled connection. Returns the open response; the caller must read it."""
+    connect_timeout, read_timeout = split_timeout(timeout)
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    for _ in range(2):
+        connection, reused = get_connection(parts.scheme, parts.netloc, connect_timeout)
+        try:
+            if connection.sock is None:
+                connection.timeout = connect_timeout
+                connection.connect()
+            # Reads (and a stalled server) are bounded separately from connecting
+            connection.sock.settimeout(read_timeout)
+            request_headers = dict(headers)
+            target = path
+            if connection.proxied:
+                target = url
+                if connection.proxy_authorization:
+                    request_headers["Proxy-Authorization"] = connection.proxy_authorization
+            connection.request("GET", target, headers=request_headers)
+            response = connection.getresponse()
+            # Kept so stream_body can shorten each read as the deadline nears
+            response.socket = connection.sock
+            return response
+        except (http.client.HTTPException, OSError) as e:
+            drop_connection(parts.scheme, parts.netloc)
+            # A server may close an idle keep-alive connection; that is not a
+            # failed attempt, so try once more on a fresh connection
+            if reused and isinstance(e, (http.client.RemoteDisconnected, ConnectionError)):
+                continue
+            if isinstance(e, http.client.HTTPException):
+                raise urllib.error.URLError(e)
+            raise
+
+def time_left(deadline_at):
+    """Seconds until the monotonic deadline_at (None: no deadline); raises TimeoutError once it has passed."""
+    if deadline_at is None:
+        return None
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("fetch deadline exceeded")
+    return remaining
+
+def stream_body(response, out, read_timeout=READ_TIMEOUT, deadline_at=None):
+    """
+    Copies response to out, decoding gzip on the fly. Returns the bytes received
+    on the wire. Each read returns whatever arrived (read1), so a server trickling
+    bytes cannot hold the fetch past deadline_at.
+    """
+    decoder = None
+    if response.getheader("Content-Encoding", "").lower() == "gzip":
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    received = 0
+    while True:
+        remaining = time_left(deadline_at)
+        if remaining is not None and getattr(response, "socket", None) is not None:
+            response.socket.settimeout(min(read_timeout, remaining))
+        chunk = response.read1(CHUNK_SIZE)
+        if not chunk:
+            break
+        received += len(chunk)
+        out.write(decoder.decompress(chunk) if decoder else chunk)
+    # read1() leaves a fully read response open, which would block the next request
+    response.close()
+    if decoder:
+        out.write(decoder.flush())
+    return received
+
+def fetch_local(url, cache_dir, stats):
+    """Copies a file:// url into the cache; changed is False when the copy is already identical."""
+    body_path, _ = cache_paths(url, cache_dir)
+    source = urllib.request.url2pathname(urllib.parse.urlsplit(url).path)
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.exists(body_path) and filecmp.cmp(source, body_path, shallow=False):
+        return FetchResult(body_path, False)
+    tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+    try:
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, body_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if stats is not None:
+        stats["bytes"] = os.path.getsize(body_path)
+    return FetchResult(body_path, True)
+
+def check_url(url, schemes=("http", "https", "file")):
+    """Rejects urls this client cannot fetch, before any attempt is made."""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in schemes:
+        raise ValueError(f"unsupported URL scheme {parts.scheme!r} in {url}")
+    if parts.scheme != "file" and not parts.netloc:
+        raise ValueError(f"no host in {url}")
+
+def fetch_sheet(url, cache_dir=FETCH_CACHE_DIR, headers=None, timeout=None, stats=None, deadline_at=None):
+    """
+    Downloads url into the cache, revalidating any cached copy with ETag/Last-Modified.
+    file:// urls are copied from disk. One attempt; see fetch_with_retries() for
+    timeouts, retries and a deadline (deadline_at, on the time.monotonic() clock).
+    """
+    check_url(url)
+    if urllib.parse.urlsplit(url).scheme == "file":
+        return fetch_local(url, cache_dir, stats)
+    body_path, meta_path = cache_paths(url, cache_dir)
+    meta = load_cache_meta(meta_path) if os.path.exists(body_path) else {}
+
+    request_headers = {"Accept-Encoding": "gzip", **(headers or {})}
+    if meta.get("etag"):
+        request_headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        request_headers["If-Modified-Since"] = meta["last_modified"]
+
+    # Published sheets answer with a redirect to the CSV export host
+    target = url
+    for _ in range(MAX_REDIRECTS + 1):
+        # A redirect may not leave HTTP(S), least of all for a local file
+        check_url(target, ("http", "https"))
+        response = send_request(target, request_headers, request_timeout(timeout, deadline_at))
+        if response.status not in (301, 302, 303, 307, 308):
+            break
+        response.read()
+        location = response.getheader("Location")
+        if not location:
+            raise urllib.error.HTTPError(target, response.status, "redirect without a Location header",
+                                         response.headers, None)
+        target = urllib.parse.urljoin(target, location)
+    else:
+        raise urllib.error.URLError(f"too many redirects for {url}")
+
+    if stats is not None:
+        stats["status"] = response.status
+    if response.status == 304 and meta:
+        response.read()
+        return FetchResult(body_path, False)
+    if response.status != 200:
+        response.read()
+        raise urllib.error.HTTPError(target, response.status, response.reason, response.headers, None)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Each thread gets its own temp file, so concurrent fetches of one url never interleave
+    tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+    try:
+        # Stream straight to disk; the body is never held in memory
+        with open(tmp_path, 'wb') as out:
+            received = stream_body(response, out, split_timeout(timeout)[1], deadline_at)
+        os.replace(tmp_path, body_path)
+    except BaseException:
+        # A half-read response leaves the connection unusable for the next request
+        drop_connection_for(target)
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if stats is not None:
+        stats["bytes"] = received
+
+    new_meta = {
+        "url": url,
+        "etag": response.getheader("ETag"),
+        "last_modified": response.getheader("Last-Modified")
+    }
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(new_meta, f, indent=2)
+
+    return FetchResult(body_path, True)
+
+def request_timeout(timeout, deadline_at):
+    """(connect, read) timeouts, shortened so that no single wait runs past deadline_at."""
+    connect_timeout, read_timeout = split_timeout(timeout)
+    remaining = time_left(deadline_at)
+    if remaining is None:
+        return connect_timeout, read_timeout
+    return min(connect_timeout, remaining), min(read_timeout, remaining)
+
+def is_retryable(error):
+    """Timeouts, connection failures and 5xx/429 answers are worth another try; other HTTP errors are not."""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code >= 500 or error.code == 429
+    return isinstance(error, OSError)
+
+def record_metrics(entry, cache_dir):
+    print(f"Fetch {entry['url']}: {entry['outcome']} after {entry['attempts']} attempt(s) "
+          f"in {entry['seconds']:.2f}s (status {entry.get('status')}, {entry.get('bytes', 0)} bytes)")
+    os.makedirs(cache_dir, exist_ok=True)
+    with _metrics_lock, open(os.path.join(cache_dir, FETCH_METRICS_FILE), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + "\n")
+
+def fetch_with_retries(url, cache_dir=FETCH_CACHE_DIR, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES,
+                       backoff=RETRY_BACKOFF, deadline=FETCH_DEADLINE, headers=None):
+    """
+    fetch_sheet() with connect/read timeouts, retrying transient failures with
+    jittered exponential backoff, and giving up once deadline seconds have passed.
+    """
+    start = time.monotonic()
+    deadline_at = start + deadline
+    entry = {"url": url, "attempts": 0, "errors": []}
+    try:
+        for attempt in range(retries + 1):
+            if time.monotonic() >= deadline_at:
+                raise TimeoutError(f"deadline of {deadline}s exceeded for {url}")
+            entry["attempts"] += 1
+            attempt_start = time.monotonic()
+            try:
+                # No wait, including each read of the body, may run past the deadline
+                result = fetch_sheet(url, cache_dir, headers, timeout, entry, deadline_at)
+                entry["latencies"] = entry.get("latencies", []) + [round(time.monotonic() - attempt_start, 3)]
+                entry["outcome"] = "downloaded" if result.changed else "not modified"
+                return result
+            except Exception as e:
+                entry["latencies"] = entry.get("latencies", []) + [round(time.monotonic() - attempt_start, 3)]
+                entry["errors"].append(str(e))
+                if attempt == retries or not is_retryable(e):
+                    raise
+                # Full jitter keeps retrying cron hosts from hitting the server in lockstep
+                delay = random.uniform(0, backoff * 2 ** attempt)
+                if time.monotonic() - start + delay >= deadline:
+                    raise
+                print(f"Retrying {url} in {delay:.1f}s after error: {e}")
+                time.sleep(delay)
+    except Exception:
+        entry["outcome"] = "failed"
+        raise
+    finally:
+        entry["seconds"] = round(time.monotonic() - start, 3)
+        record_metrics(entry, cache_dir)
+
+def fetch_many(sources, cache_dir=FETCH_CACHE_DIR):
+    """
+    Fetches sources concurrently. Each source is a dict with a "url" and
+    optional "timeout" (seconds, or [connect, read]), "retries" and "deadline".
+    Returns one SourceFetch per source, in order.
+    """
+    def fetch_one(source):
+        start = time.monotonic()
+        try:
+            result = fetch_with_retries(source["url"], cache_dir, source.get("timeout", FETCH_TIMEOUT),
+                                        source.get("retries", FETCH_RETRIES),
+                                        deadline=source.get("deadline", FETCH_DEADLINE))
+            return SourceFetch(source["url"], result, None, time.monotonic() - start)
+        except Exception as e:
+            return SourceFetch(source["url"], None, e, time.monotonic() - start)
+
+    if not sources:
+        return []
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(sources))) as pool:
+        return list(pool.map(fetch_one, sources))
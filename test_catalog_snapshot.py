@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+
+import catalog_snapshot
+from catalog_snapshot import read_snapshot, write_snapshot
+from discount_model import new_discount
+
+def fail(message):
+    print(f"FAIL: {message}")
+    sys.exit(1)
+
+try:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.snapshot")
+        discounts = [
+            new_discount(id="cafe-1", businessName="Café Señor", category="Eat & Drink (Food & Dining)",
+                         whoCanRedeem=["Students", "Alumni"], isFeatured=True, tags=["eat"],
+                         description="Tacos — 10% off", latitude=26.3017, longitude=-98.1633,
+                         nearestCampus="Edinburg", campusDistanceMiles=1.2),
+            # Online partner: no coordinates, no tags
+            new_discount(id="web-2", businessName="Web Shop", category="Shop (Retail)",
+                         whoCanRedeem=["Faculty", "Staff"]),
+            new_discount(id="cafe-3", businessName="Cafe Two", category="Eat & Drink (Food & Dining)",
+                         whoCanRedeem=["Students", "Alumni"], tags=["eat"]),
+        ]
+
+        # 1. Every field survives a write and a memory-mapped read
+        if write_snapshot(iter(discounts), path, "csv-hash") != 3:
+            fail("Row count was not returned")
+        snapshot = read_snapshot(path)
+        if snapshot["discounts"] != discounts or snapshot["sourceHash"] != "csv-hash":
+            fail(f"Round trip changed the catalog ({snapshot})")
+        loaded = snapshot["discounts"]
+        if loaded[0].category is not loaded[2].category or loaded[0].whoCanRedeem is not loaded[2].whoCanRedeem:
+            fail("Dictionary-encoded values are not shared")
+
+        # 2. Dictionaries larger than 16-bit codes still round-trip
+        many = [new_discount(id=str(i), businessName="B", category=f"Category {i}") for i in range(70000)]
+        write_snapshot(many, path, None)
+        if [d.category for d in read_snapshot(path)["discounts"]][-2:] != ["Category 69998", "Category 69999"]:
+            fail("Wide dictionary codes were not decoded")
+
+        # 3. Roles outside the bitmask are refused, leaving the previous file alone
+        before = open(path, 'rb').read()
+        try:
+            write_snapshot([new_discount(id="x", businessName="X", whoCanRedeem=["Visitors"])], path, None)
+            fail("Unknown role was encoded")
+        except ValueError:
+            pass
+        if open(path, 'rb').read() != before or os.listdir(tmp) != ["catalog.snapshot"]:
+            fail("Failed write touched the existing snapshot or left files behind")
+
+        # 4. Files from another format are rejected
+        with open(path, 'wb') as f:
+            f.write(b"id,businessName\n")
+        try:
+            read_snapshot(path)
+            fail("A CSV was read as a snapshot")
+        except ValueError:
+            pass
+        if catalog_snapshot.snapshot_path("out/categorized_discounts.csv") != "out/categorized_discounts.snapshot":
+            fail("Snapshot path does not sit next to the CSV")
+
+    print("SUCCESS: Catalog snapshot verification passed.")
+
+except SystemExit:
+    raise
+except Exception as e:
+    print(f"FAIL: Exception during test: {e}")
+    sys.exit(1)
@@ -0,0 +1,59 @@
+import sys
+
+from discount_model import (from_columns, from_csv_row, from_json, new_discount, to_columns, to_csv_row,
+                            to_json)
+
+def fail(message):
+    print(f"FAIL: {message}")
+    sys.exit(1)
+
+try:
+    row = {
+        "id": "taco-spot-1a2b3c", "businessName": "Taco Spot", "category": "Eat & Drink (Food & Dining)",
+        "discountAmount": "10% off", "whoCanRedeem": "Students;Alumni", "howToRedeem": "UTRGV ID",
+        "description": "Tacos", "address": "1 Main St, Edinburg", "phone": "", "email": "", "website": "",
+        "campusProximity": "1.2 mi from UTRGV Edinburg", "isFeatured": "True", "tags": "eat",
+        "joinDate": "", "authorizedBy": "", "contactTitle": "",
+        "latitude": "26.3017", "longitude": "-98.1633", "nearestCampus": "Edinburg", "campusDistanceMiles": "1.2"
+    }
+
+    # 1. CSV rows decode to typed fields and encode back unchanged
+    discount = from_csv_row(row)
+    if discount.whoCanRedeem != ("Students", "Alumni") or discount.isFeatured is not True:
+        fail(f"CSV fields were not typed ({discount})")
+    if (discount.latitude, discount.campusDistanceMiles) != (26.3017, 1.2):
+        fail("Coordinates were not parsed")
+    if to_csv_row(discount) != row:
+        fail(f"CSV round trip changed the row ({to_csv_row(discount)})")
+
+    # 2. Unplaced addresses stay empty in the CSV and null on the page
+    unplaced = from_csv_row({**row, "latitude": "", "longitude": "", "campusDistanceMiles": ""})
+    if to_csv_row(unplaced)["latitude"] != "" or to_json(unplaced)["lat"] is not None:
+        fail("Missing coordinates were not preserved")
+
+    # 3. The page form keeps lists and booleans, and decodes to the same record
+    item = to_json(discount)
+    if item["whoCanRedeem"] != ["Students", "Alumni"] or item["tags"] != ["eat"] or item["isFeatured"] is not True:
+        fail(f"Page form is wrong ({item})")
+    if to_json(from_json(item)) != item:
+        fail("JSON round trip changed the item")
+
+    # 4. Categories and role sets are shared between records
+    other = new_discount(id="x", businessName="X", category="".join(["Eat & Drink ", "(Food & Dining)"]),
+                         whoCanRedeem=["Students", "Alumni"])
+    if other.category is not discount.category or other.whoCanRedeem is not discount.whoCanRedeem:
+        fail("Category or roles were not interned")
+
+    # 5. A columnar batch holds the same records
+    if from_columns(to_columns([discount, other])) != [discount, other]:
+        fail("Columnar batch round trip failed")
+    if any(to_columns([]).values()):
+        fail("Empty batch has values")
+
+    print("SUCCESS: Discount model verification passed.")
+
+except SystemExit:
+    raise
+except Exception as e:
+    print(f"FAIL: Exception during test: {e}")
+    sys.exit(1)
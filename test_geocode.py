@@ -0,0 +1,113 @@
+import os
+import sys
+import tempfile
+
+import geocode
+from catalog_indexes import build_geo_index, geo_cell_key
+
+def fail(message):
+    print(f"FAIL: {message}")
+    sys.exit(1)
+
+try:
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "geocode_cache.json")
+
+        # 1. The gazetteer prefers a known ZIP code over the city name
+        location = geocode.gazetteer_provider("504 S. Closner Blvd, Edinburg, TX 78539")
+        if location["precision"] != "zip" or (location["lat"], location["lng"]) != geocode.RGV_ZIPS["78539"]:
+            fail(f"ZIP code was not used ({location})")
+        # A mistyped ZIP falls back to the city instead of the street number
+        location = geocode.gazetteer_provider("2109 S 10th St, McAllen, TX 77503")
+        if location["precision"] != "city" or (location["lat"], location["lng"]) != geocode.RGV_CITIES["mcallen"]:
+            fail(f"City fallback failed ({location})")
+        # The locality wins over a street named after another city
+        for address, city in (("1200 N Alamo Rd, Edinburg, TX", "edinburg"), ("500 Mission St, Weslaco, TX", "weslaco"),
+                              ("San Juan Ave, Pharr, TX", "pharr"), ("Multiple Locations (Mission, Harlingen)", "mission")):
+            location = geocode.gazetteer_provider(address)
+            if (location["lat"], location["lng"]) != geocode.RGV_CITIES[city]:
+                fail(f"{address!r} was not placed in {city} ({location})")
+        for address in ("Valleywide", "Online", "2758 W. University Dr.", ""):
+            if geocode.gazetteer_provider(address) is not None:
+                fail(f"Unplaceable address {address!r} was geocoded")
+
+        # 2. Real distances: an Edinburg address is closest to the Edinburg campus
+        located = geocode.locate(geocode.load_geocoder(path=cache_path), "2302 Continental St, Edinburg")
+        if located["nearestCampus"] != "Edinburg" or not 0 < located["campusDistanceMiles"] < 3:
+            fail(f"Wrong nearest campus ({located})")
+        if geocode.proximity_label(None) != "RGV Area":
+            fail("Unplaceable addresses lost the RGV Area label")
+        miles = geocode.distance_miles(geocode.CAMPUSES["Edinburg"], geocode.CAMPUSES["Brownsville"])
+        if not 45 < miles < 55:
+            fail(f"Edinburg-Brownsville distance is off ({miles:.1f} mi)")
+
+        # 3. Multi-location entries use the location closest to a campus
+        located = geocode.locate(geocode.load_geocoder(path=cache_path),
+                                 "2627 N Texas Blvd, Weslaco, TX 78599; 3154 Central Blvd, Brownsville, TX 78520")
+        if located["nearestCampus"] != "Brownsville":
+            fail(f"Closest of several locations was not chosen ({located})")
+
+        # 4. A pluggable provider is asked once per normalized address, then the cache answers
+        calls = []
+        def fake_provider(address):
+            calls.append(address)
+            return {"lat": 26.30, "lng": -98.17, "precision": "street"}
+        geocode.GEOCODERS["fake"] = fake_provider
+        geocoder = geocode.load_geocoder("fake", cache_path)
+        geocode.geocode(geocoder, "1201 S McColl Rd")
+        geocode.geocode(geocoder, "1201 s. mccoll rd.")
+        geocode.save_geocoder(geocoder, cache_path)
+        geocode.geocode(geocode.load_geocoder("fake", cache_path), "1201 S McColl Rd")
+        if len(calls) != 1:
+            fail(f"Provider was called {len(calls)} times for one address")
+
+        # 5. A failing provider falls back to the gazetteer without poisoning the cache
+        def broken_provider(address):
+            raise OSError("network unreachable")
+        geocode.GEOCODERS["broken"] = broken_provider
+        geocoder = geocode.load_geocoder("broken", cache_path)
+        location = geocode.geocode(geocoder, "810 N Alamo Rd, Alamo, TX 78516")
+        if location is None or location["precision"] != "zip" or geocoder["dirty"]:
+            fail(f"Provider failure was not handled ({location})")
+
+        # 6. Switching to a more precise provider re-geocodes gazetteer answers,
+        #    but an address it cannot place is not asked about again
+        precise_calls = []
+        def precise_provider(address):
+            precise_calls.append(address)
+            return {"lat": 26.31, "lng": -98.17, "precision": "street"} if "Closner" in address else None
+        original_nominatim = geocode.GEOCODERS["nominatim"]
+        geocode.GEOCODERS["nominatim"] = precise_provider
+        try:
+            geocoder = geocode.load_geocoder("gazetteer", cache_path)
+            geocode.geocode(geocoder, "504 S. Closner Blvd, Edinburg, TX 78539")
+            geocode.geocode(geocoder, "Multiple Locations (Edinburg)")
+            geocode.save_geocoder(geocoder, cache_path)
+            for _ in range(2):
+                geocoder = geocode.load_geocoder("nominatim", cache_path)
+                location = geocode.geocode(geocoder, "504 S. Closner Blvd, Edinburg, TX 78539")
+                geocode.geocode(geocoder, "Multiple Locations (Edinburg)")
+                geocode.save_geocoder(geocoder, cache_path)
+            if location["precision"] != "street" or len(precise_calls) != 2:
+                fail(f"Provider change did not re-geocode exactly once ({location}, {precise_calls})")
+            location = geocode.geocode(geocode.load_geocoder("gazetteer", cache_path),
+                                       "504 S. Closner Blvd, Edinburg, TX 78539")
+            if location["precision"] != "street":
+                fail("Switching back to the gazetteer discarded street-level answers")
+        finally:
+            geocode.GEOCODERS["nominatim"] = original_nominatim
+
+        # 7. The geo index buckets placed discounts by cell and skips unplaced ones
+        discounts = [{"lat": 26.3050, "lng": -98.1735}, {"lat": None, "lng": None},
+                     {"lat": 26.3051, "lng": -98.1736}, {"lat": 25.8967, "lng": -97.4914}]
+        cells = build_geo_index(discounts)["cells"]
+        if cells.get(geo_cell_key(26.3050, -98.1735)) != [0, 2] or sum(map(len, cells.values())) != 3:
+            fail(f"Geo index cells are wrong ({cells})")
+
+    print("SUCCESS: Geocoding verification passed.")
+
+except SystemExit:
+    raise
+except Exception as e:
+    print(f"FAIL: Exception during test: {e}")
+    sys.exit(1)
@@ -0,0 +1,160 @@
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import fetch_and_process
+import geocode
+from catalog_delta import load_delta
+from catalog_snapshot import read_snapshot
+
+HEADER = "Name of the Business,Discount Amount,Who Can Redeem,Address,Category\n"
+SHEETS = {
+    "/partners": HEADER + "Taco Spot,10% off,Students,\"1 Main St, Edinburg, TX\",Food\n",
+    # Same business as the main sheet, written slightly differently
+    "/alumni": HEADER + "TACO SPOT,15% off,Alumni,\"1 Main St., Edinburg, TX\",Food\n"
+                        "Book Nook,Free coffee,Alumni,,Shop (Retail)\n",
+    "/engineering": HEADER + "Circuit Shack,5% off,Students,,Technology\n",
+}
+DELAY = 0.6
+
+# Mutable state shared with the stand-in server
+failures = {}  # path -> number of 500s still to send
+hangs = set()  # paths that never answer within the client timeout
+hits = []
+
+class SheetHandler(http.server.BaseHTTPRequestHandler):
+    """Slow stand-in for several published sheets, with scripted failures."""
+
+    def do_GET(self):
+        hits.append(self.path)
+        if self.path in hangs:
+            time.sleep(2)
+        time.sleep(DELAY)
+        if failures.get(self.path):
+            failures[self.path] -= 1
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = SHEETS[self.path].encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client already gave up on a hung request
+
+    def log_message(self, *args):
+        pass
+
+def fail(message):
+    print(f"FAIL: {message}")
+    sys.exit(1)
+
+server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SheetHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base = f"http://127.0.0.1:{server.server_address[1]}"
+sources = [{"name": path[1:], "url": base + path, "timeout": 1} for path in SHEETS]
+
+try:
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as work:
+        os.chdir(tmp)
+
+        # 1. Sources download concurrently and merge with duplicates removed
+        # (run from another directory: the delta, change log, id registry and geocode
+        # cache go next to the output)
+        os.chdir(work)
+        start = time.monotonic()
+        if not fetch_and_process.main(output_csv=os.path.join(tmp, "out.csv"), sources=sources):
+            fail("Initial multi-source run did not write output")
+        elapsed = time.monotonic() - start
+        os.chdir(tmp)
+        beside_output = {"out.delta.json", "sheet_changes.jsonl", "discount_ids.json", "geocode_cache.json"}
+        if not beside_output <= set(os.listdir(tmp)):
+            fail("Delta, change log, id registry or geocode cache was not written next to the output")
+        if beside_output & set(os.listdir(work)):
+            fail("Delta, change log, id registry or geocode cache was written to the working directory")
+        if elapsed > DELAY * 2:
+            fail(f"Sources were not fetched concurrently ({elapsed:.2f}s for {len(sources)} x {DELAY}s)")
+        output = open("out.csv", encoding='utf-8').read()
+        if output.count("Taco Spot") != 1 or "TACO SPOT" in output:
+            fail("Duplicate business across sources was not merged into the first source's row")
+        if "Book Nook" not in output or "Circuit Shack" not in output:
+            fail("Rows from secondary sources are missing")
+        if len(read_snapshot("out.snapshot")["discounts"]) != output.count("\n") - 1:
+            fail("Columnar snapshot does not match the CSV")
+
+        # 2. A transient 500 is retried
+        failures["/engineering"] = 1
+        hits.clear()
+        fetch_and_process.main(output_csv="out.csv", sources=sources, force=True)
+        if hits.count("/engineering") != 2:
+            fail(f"Failed source was not retried exactly once (hits: {hits})")
+
+        # 3. A source that times out falls back to its last downloaded copy
+        hangs.add("/alumni")
+        sources[1]["retries"] = 0
+        if not fetch_and_process.main(output_csv="out.csv", sources=sources, force=True):
+            fail("Timed-out source with a cached copy aborted the run")
+        if "Book Nook" not in open("out.csv", encoding='utf-8').read():
+            fail("Cached copy of the timed-out source was not used")
+        hangs.clear()
+
+        # 4. A failing source with nothing cached leaves the output untouched
+        SHEETS["/athletics"] = HEADER
+        failures["/athletics"] = 1
+        before = open("out.csv", encoding='utf-8').read()
+        athletics = {"name": "athletics", "url": base + "/athletics", "retries": 0}
+        if fetch_and_process.main(output_csv="out.csv", force=True, sources=sources + [athletics]) is not None:
+            fail("Run did not report failure although a source had no usable copy")
+        if open("out.csv", encoding='utf-8').read() != before:
+            fail("Output was rewritten after a source failed")
+
+        # 5. Unchanged sheets are skipped, unless the last run failed to process them
+        if fetch_and_process.main(output_csv="out.csv", sources=sources) is not False:
+            fail("Unchanged sheets were processed again, or reported as a failure")
+        SHEETS["/engineering"] += "Robot Garage,20% off,Students,,Technology\n"
+        process_row = fetch_and_process.process_row
+        fetch_and_process.process_row = lambda *args: 1 / 0
+        try:
+            if fetch_and_process.main(output_csv="out.csv", sources=sources) is not None:
+                fail("Run did not report failure although processing failed")
+        finally:
+            fetch_and_process.process_row = process_row
+        if not fetch_and_process.main(output_csv="out.csv", sources=sources):
+            fail("Sheet whose processing failed was skipped on the next run")
+        if "Robot Garage" not in open("out.csv", encoding='utf-8').read():
+            fail("Retried run did not pick up the new row")
+        delta = load_delta("out.csv")
+        if [row["businessName"] for row in delta["added"]] != ["Robot Garage"] or delta["removed"] or delta["modified"]:
+            fail(f"Delta does not describe the new row ({delta})")
+        # Choosing another geocoder reprocesses the unchanged sheets once
+        geocode.GEOCODERS["street"] = lambda address: {"lat": 26.31, "lng": -98.17, "precision": "street"}
+        geocode.GEOCODER_PRECISION["street"] = 1
+        if not fetch_and_process.main(output_csv="out.csv", sources=sources, geocoder_name="street"):
+            fail("Geocoder change was skipped as not modified")
+        if fetch_and_process.main(output_csv="out.csv", sources=sources, geocoder_name="street"):
+            fail("Unchanged sheets were processed again with the same geocoder")
+
+        # 6. A corrupt id registry is reseeded from the published CSV, keeping ids
+        ids_before = [line.split(",")[0] for line in open("out.csv", encoding='utf-8')]
+        with open("discount_ids.json", 'w', encoding='utf-8') as f:
+            f.write('{"ids": {"taco')
+        if not fetch_and_process.main(output_csv="out.csv", sources=sources, force=True):
+            fail("Corrupt id registry aborted the run")
+        if [line.split(",")[0] for line in open("out.csv", encoding='utf-8')] != ids_before:
+            fail("Ids changed after reseeding the registry")
+
+    print("SUCCESS: Multi-source ingest verification passed.")
+
+except SystemExit:
+    raise
+except Exception as e:
+    print(f"FAIL: Exception during test: {e}")
+    sys.exit(1)
+finally:
+    server.shutdown()
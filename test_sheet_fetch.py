@@ -0,0 +1,203 @@
+import gzip
+import http.server
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+
+import fetch_and_process
+from sheet_fetch import FETCH_CACHE_DIR, FETCH_METRICS_FILE, fetch_sheet, fetch_with_retries
+
+SHEET_V1 = "Name of the Business,Discount Amount,Who Can Redeem,Category\nTaco Spot,10% off,Students,\n"
+SHEET_V2 = SHEET_V1 + "Book Nook,Free coffee,Faculty,Shop (Retail)\n"
+
+# Mutable state shared with the stand-in server
+sheet = {"body": SHEET_V1, "etag": '"v1"', "last_modified": None, "gzip": False, "errors": 0, "delay": 0,
+         "trickle": 0, "bare_redirect": False}
+seen = []
+connections = []
+
+class SheetHandler(http.server.BaseHTTPRequestHandler):
+    """Minimal keep-alive stand-in for the published Google Sheet with validator support."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        seen.append((self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        connections.append(self.client_address)
+        time.sleep(sheet["delay"])
+        if sheet["errors"]:
+            sheet["errors"] -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if sheet["bare_redirect"]:
+            self.send_response(302)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag, last_modified = sheet["etag"], sheet["last_modified"]
+        if (etag and self.headers.get("If-None-Match") == etag) or \
+           (last_modified and self.headers.get("If-Modified-Since") == last_modified):
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = sheet["body"].encode('utf-8')
+        self.send_response(200)
+        if sheet["gzip"] and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        if sheet["trickle"]:
+            # One byte at a time: every read succeeds well inside the read timeout
+            try:
+                for i in range(len(body)):
+                    self.wfile.write(body[i:i + 1])
+                    self.wfile.flush()
+                    time.sleep(sheet["trickle"])
+            except ConnectionError:
+                pass  # The client gave up at its deadline
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def fail(message):
+    print(f"FAIL: {message}")
+    sys.exit(1)
+
+server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SheetHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f"http://127.0.0.1:{server.server_address[1]}/pub?output=csv"
+
+try:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+
+        # 1. First fetch downloads and caches the body
+        result = fetch_sheet(url)
+        if not result.changed or open(result.path, encoding='utf-8').read() != SHEET_V1:
+            fail("First fetch did not download the sheet")
+
+        # 2. Second fetch revalidates with If-None-Match and gets a 304
+        result = fetch_sheet(url)
+        if result.changed:
+            fail("Unchanged sheet was reported as changed")
+        if seen[-1][0] != '"v1"':
+            fail(f"If-None-Match not sent (got {seen[-1]})")
+
+        # 3. Pipeline short-circuits on a 304 once output exists
+        if not fetch_and_process.main(url, "out.csv"):
+            fail("Initial pipeline run did not write output")
+        mtime = os.path.getmtime("out.csv")
+        if fetch_and_process.main(url, "out.csv") is not False:
+            fail("Pipeline reprocessed an unchanged sheet, or reported it as a failure")
+        if os.path.getmtime("out.csv") != mtime:
+            fail("Output was rewritten on a 304")
+
+        # 4. A new ETag triggers a full refresh
+        sheet.update(body=SHEET_V2, etag='"v2"')
+        if not fetch_and_process.main(url, "out.csv"):
+            fail("Changed sheet was not reprocessed")
+        if "Book Nook" not in open("out.csv", encoding='utf-8').read():
+            fail("Refreshed output is missing the new row")
+
+        # 5. Last-Modified alone is enough to revalidate
+        sheet.update(etag=None, last_modified="Wed, 10 Dec 2025 14:54:52 GMT")
+        fetch_sheet(url)
+        if fetch_sheet(url).changed or seen[-1][1] != sheet["last_modified"]:
+            fail("If-Modified-Since revalidation failed")
+
+        # 6. Requests from one thread reuse a single keep-alive connection
+        del connections[:]
+        for _ in range(3):
+            fetch_sheet(url)
+        if len(set(connections)) != 1:
+            fail(f"Connection was not reused ({len(set(connections))} connections for 3 requests)")
+
+        # 7. gzip responses are requested and decoded on the fly
+        sheet.update(gzip=True, etag='"v3"', last_modified=None)
+        result = fetch_sheet(url)
+        if open(result.path, encoding='utf-8').read() != SHEET_V2:
+            fail("gzip-encoded body was not decoded")
+
+        # 8. A transient 503 is retried, and the attempts land in the metrics log
+        sheet.update(errors=1, etag='"v4"')
+        fetch_with_retries(url, backoff=0.01)
+        with open(os.path.join(FETCH_CACHE_DIR, FETCH_METRICS_FILE), encoding='utf-8') as f:
+            last = json.loads(f.readlines()[-1])
+        if last["attempts"] != 2 or last["outcome"] != "downloaded" or len(last["latencies"]) != 2:
+            fail(f"Retry was not recorded in the metrics log (got {last})")
+
+        # 9. The deadline bounds the whole fetch, however generous the timeouts
+        sheet.update(delay=1.5, etag='"v5"')
+        start = time.monotonic()
+        try:
+            fetch_with_retries(url, timeout=(5, 5), retries=3, backoff=0.01, deadline=0.5)
+            fail("Fetch finished although the server was slower than the deadline")
+        except OSError:
+            pass
+        if time.monotonic() - start > 1.2:
+            fail(f"Deadline was not enforced ({time.monotonic() - start:.2f}s)")
+        sheet.update(delay=0)
+
+        # 10. A server trickling bytes cannot hold the body read past the deadline
+        sheet.update(trickle=0.4, etag='"v6"')
+        start = time.monotonic()
+        try:
+            fetch_with_retries(url, timeout=(5, 5), retries=0, deadline=1.0)
+            fail("Trickled body finished although it outlasted the deadline")
+        except OSError:
+            pass
+        if time.monotonic() - start > 1.5:
+            fail(f"Deadline was not enforced while reading ({time.monotonic() - start:.2f}s)")
+        sheet.update(trickle=0)
+
+        # 11. A redirect without a Location header is a clear, non-retried error
+        sheet.update(bare_redirect=True)
+        before = len(seen)
+        try:
+            fetch_with_retries(url, retries=3, backoff=0.01)
+            fail("Redirect without a Location header was followed")
+        except urllib.error.HTTPError as e:
+            if e.code != 302 or len(seen) - before != 1:
+                fail(f"Bare redirect was retried or misreported ({e}, {len(seen) - before} requests)")
+        sheet.update(bare_redirect=False)
+
+        # 12. file:// urls are copied from disk; other schemes fail up front
+        local = os.path.join(tmp, "local.csv")
+        with open(local, 'w', encoding='utf-8') as f:
+            f.write(SHEET_V2)
+        local_url = pathlib.Path(local).as_uri()
+        result = fetch_with_retries(local_url)
+        if not result.changed or open(result.path, encoding='utf-8').read() != SHEET_V2:
+            fail("file:// url was not copied into the cache")
+        if fetch_with_retries(local_url).changed:
+            fail("Unchanged local file was reported as changed")
+        try:
+            fetch_with_retries("ftp://example.com/sheet.csv", retries=3, backoff=0.01)
+            fail("Unsupported scheme was accepted")
+        except ValueError:
+            pass
+
+    print("SUCCESS: Conditional sheet fetch verification passed.")
+
+except SystemExit:
+    raise
+except Exception as e:
+    print(f"FAIL: Exception during test: {e}")
+    sys.exit(1)
+finally:
+    server.shutdown()
@@ -1,5 +1,8 @@
 import json
 
+from discount_model import new_discount, to_json
+from geocode import load_geocoder, locate, proximity_label, save_geocoder
+
 # Category mapping
 cat_map = {
     "Dining": "Eat & Drink (Food & Dining)",
@@ -17,6 +20,9 @@ cat_map = {
 with open("listings.json", "r") as f:
     data = json.load(f)
 
+# Offline gazetteer only; shares the ingest's geocode cache
+geocoder = load_geocoder("gazetteer")
+
 new_data = []
 for item in data:
     # Who mapping
@@ -38,34 +44,33 @@ for item in data:
 
     # Address/City logic
     addr = item.get("address", "")
+    located = locate(geocoder, addr)
 
     # Feature flag (randomly feature some)
     is_featured = False
     if item["id"] in [501, 403, 102, 602, 308]: # Example featured IDs
         is_featured = True
 
-    new_entry = {
-        "id": str(item["id"]),
-        "businessName": item.get("vendor", "Unknown"),
-        "category": new_cat,
-        "discountAmount": item.get("discount", "See details"),
-        "whoCanRedeem": who_list,
-        "howToRedeem": item.get("how", "Show UTRGV ID"),
-        "description": desc,
-        "address": addr,
-        "phone": item.get("phone", ""),
-        "email": "", # Not in source
-        "website": "", # Not in source clearly, mostly
-        "social": "",
-        "campusProximity": "Near " + addr.split(",")[1].strip() if "," in addr else "RGV Area",
-        "isFeatured": is_featured,
-        "tags": [new_cat.split(" ")[0].lower()] # Simple tag generation
-    }
-
-    # Clean up phone
-    if not new_entry["phone"]:
-        new_entry["phone"] = ""
+    new_entry = new_discount(
+        id=str(item["id"]),
+        businessName=item.get("vendor", "Unknown"),
+        category=new_cat,
+        discountAmount=item.get("discount", "See details"),
+        whoCanRedeem=who_list,
+        howToRedeem=item.get("how", "Show UTRGV ID"),
+        description=desc,
+        address=addr,
+        phone=item.get("phone") or "",
+        email="", # Not in source
+        website="", # Not in source clearly, mostly
+        campusProximity=proximity_label(located),
+        isFeatured=is_featured,
+        tags=[new_cat.split(" ")[0].lower()], # Simple tag generation
+        latitude=(located or {}).get("latitude"),
+        longitude=(located or {}).get("longitude")
+    )
 
     new_data.append(new_entry)
 
-print(json.dumps(new_data, indent=2))
+save_geocoder(geocoder)
+print(json.dumps([to_json(entry) for entry in new_data], indent=2))
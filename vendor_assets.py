@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+import urllib.error
+
+from sheet_fetch import cache_paths, fetch_with_retries
+
+# Upstream copies of the third-party assets the page used to load from CDNs
+FONT_CSS_URL = "https://fonts.googleapis.com/css2?family=Open+Sans:ital,wght@0,300;0,400;0,600;0,700;0,800;1,400&display=swap"
+JSPDF_URL = "https://cdnjs.cloudflare.com/ajax/libs/jspdf/2.5.1/jspdf.umd.min.js"
+ASSET_CACHE_DIR = ".asset_cache"
+ASSET_DIR = "assets"
+
+# Google Fonts picks the font format from the User-Agent; this one gets woff2
+WOFF2_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+# Always kept in the subset so text that arrives later as data (split builds,
+# catalog patches) still renders in the web font
+BASE_CHARACTERS = ("".join(chr(c) for c in range(0x20, 0x7f))
+                   + " ©®°¿¡áéíóúüñ"
+                   + "ÁÉÍÓÚÜÑ–—‘’“”•…")
+
+FONT_FACE_PATTERN = re.compile(r"@font-face\s*\{([^}]*)\}")
+FONT_URL_PATTERN = re.compile(r"url\(([^)]+)\)")
+
+def fetch_bytes(url, headers=None):
+    """Returns the body of url, falling back to the cached copy when offline."""
+    try:
+        path = fetch_with_retries(url, ASSET_CACHE_DIR, headers=headers).path
+    except (urllib.error.URLError, OSError) as e:
+        path = cache_paths(url, ASSET_CACHE_DIR)[0]
+        if not os.path.exists(path):
+            raise
+        print(f"Warning: could not refresh {url} ({e}); using the cached copy.")
+    with open(path, 'rb') as f:
+        return f.read()
+
+def parse_unicode_range(value):
+    """'U+0000-00FF, U+0131, U+4??' -> [(lo, hi), ...]"""
+    ranges = []
+    for part in value.split(','):
+        part = part.strip().upper().replace('U+', '')
+        if not part:
+            continue
+        if '?' in part:
+            lo, hi = part.replace('?', '0'), part.replace('?', 'F')
+        elif '-' in part:
+            lo, hi = part.split('-', 1)
+        else:
+            lo = hi = part
+        ranges.append((int(lo, 16), int(hi, 16)))
+    return ranges
+
+def parse_font_faces(css):
+    """Each @font-face block as a dict of its descriptors."""
+    faces = []
+    for block in FONT_FACE_PATTERN.findall(css):
+        face = {}
+        for declaration in block.split(';'):
+            if ':' in declaration:
+                name, value = declaration.split(':', 1)
+                face[name.strip()] = value.strip()
+        match = FONT_URL_PATTERN.search(face.get("src", ""))
+        if match:
+            face["url"] = match.group(1).strip('\'"')
+            faces.append(face)
+    return faces
+
+def characters_in_range(text, ranges):
+    return "".join(sorted(c for c in set(text) if any(lo <= ord(c) <= hi for lo, hi in ranges)))
+
+def subset_font(data, text):
+    """
+    Subsets a font to text as woff2. Returns None when fontTools/brotli are not
+    installed, and data itself when subsetting fails.
+    """
+    try:
+        import io
+        from fontTools import subset
+        import brotli  # noqa: F401  (fontTools needs it to write woff2)
+    except ImportError:
+        return None
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    try:
+        font = subset.load_font(io.BytesIO(data), options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(text=text)
+        subsetter.subset(font)
+        out = io.BytesIO()
+        subset.save_font(font, out, options)
+    except Exception as e:
+        # fontTools raises many error types on fonts it cannot handle; the full font still works
+        print(f"Warning: could not subset font ({e}); vendoring it whole.")
+        return data
+    return out.getvalue()
+
+def asset_path(stem, data, extension):
+    return f"{ASSET_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:10]}.{extension}"
+
+def vendor_assets(text):
+    """
+    Downloads the web font and jsPDF, subsets the font to the characters in text
+    and returns the local files plus the markup that references them.
+    """
+    css = fetch_bytes(FONT_CSS_URL, {"User-Agent": WOFF2_USER_AGENT}).decode('utf-8')
+    text = text + BASE_CHARACTERS
+    faces = []
+    for face in parse_font_faces(css):
+        ranges = parse_unicode_range(face.get("unicode-range", "U+0-10FFFF"))
+        # Subsets like cyrillic or vietnamese that the page never uses are dropped
+        if characters_in_range(text, ranges):
+            faces.append((face, ranges))
+    if not faces:
+        raise ValueError(f"no usable @font-face rules in {FONT_CSS_URL}")
+
+    files = {}
+    local_urls = {}
+    upstream_font_bytes = 0
+    subset_available = True
+    for face, ranges in faces:
+        url = face["url"]
+        if url in local_urls:
+            # Variable fonts serve every weight of a style from one file
+            continue
+        original = fetch_bytes(url)
+        upstream_font_bytes += len(original)
+        subset = subset_font(original, characters_in_range(text, ranges))
+        if subset is None:
+            subset_available = False
+        data = subset or original
+        path = asset_path("open-sans", data, "woff2")
+        files[path] = data
+        local_urls[url] = path
+
+    if not subset_available:
+        print("Warning: fontTools/brotli not installed; vendoring the upstream fonts without subsetting.")
+
+    rules = []
+    for face, _ in faces:
+        descriptors = dict(face)
+        descriptors["src"] = f"url({local_urls[descriptors.pop('url')]}) format('woff2')"
+        body = "; ".join(f"{name}: {value}" for name, value in descriptors.items())
+        rules.append(f"@font-face {{ {body}; }}")
+
+    # Preload the upright face that covers plain text; everything else loads on demand
+    preload = next((local_urls[face["url"]] for face, ranges in faces
+                    if face.get("font-style") == "normal" and characters_in_range("a", ranges)), None)
+
+    jspdf = fetch_bytes(JSPDF_URL)
+    jspdf_path = asset_path("jspdf.umd.min", jspdf, "js")
+    files[jspdf_path] = jspdf
+
+    return {
+        "files": files,
+        "fontCss": "\n".join(rules),
+        "preload": preload,
+        "jspdfUrl": jspdf_path,
+        "upstreamBytes": {"fontCss": len(css.encode('utf-8')), "fonts": upstream_font_bytes, "jspdf": len(jspdf)}
+    }